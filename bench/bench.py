@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+
+# Time the kconfigizer code paths on synthetic trees of several sizes and
+# print the results as JSON, for tracking regressions:
+#   parse         Kconfig parse (no cache)
+#   cache_save    write of the parsed Kconfig cache
+#   cache_load    Kconfig from the cache
+#   load_config   load_defconfig() of a defconfig in the resident Kconfig
+#   rows          SymRows and SymTags of the loaded defconfig
+#   render        one draw_symbols() pass in curses pads (in a pty)
+#   search        index and first name search, then a text search
+#   config_set    1000 tag edits and the configs.yaml rewrite
+#   write         config_text() + write_if_changed() of the defconfig and full config
+
+import argparse
+import fcntl
+import json
+import os
+import platform
+import pty
+import shutil
+import statistics
+import struct
+import sys
+import tempfile
+import termios
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import kconfigizer_core as K
+import kconfiglib
+
+import genkconfig
+
+def timeit(repeat, fn, prepare=None):
+    times = []
+    for i in range(repeat):
+        if prepare:
+            prepare()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+# draw_symbols() needs a curses screen: run it in a child attached to a pty
+# and get the timings back through a pipe
+def time_render(repeat, kconf, symrows, tags):
+    rfd, wfd = os.pipe()
+    pid, master = pty.fork()
+    if pid == 0:
+        os.close(rfd)
+        os.environ["TERM"] = "xterm"
+        fcntl.ioctl(0, termios.TIOCSWINSZ, struct.pack("HHHH", 60, 160, 0, 0))
+        result = {"times": []}
+        try:
+            K.curses.initscr()
+            K.curses.start_color()
+            for pair in range(1, 9):
+                K.curses.init_pair(pair, K.curses.COLOR_WHITE, K.curses.COLOR_BLACK)
+            pad = K.curses.newpad(60, 200)
+            ipad = K.curses.newpad(200, 200)
+            for i in range(repeat):
+                K.values_generation += 1
+                start = time.perf_counter()
+                K.draw_symbols(pad, ipad, symrows, tags, set(), 0, 56, 10, {})
+                pad.noutrefresh(0, 0, 4, 0, 59, 159)
+                ipad.noutrefresh(0, 0, 5, 50, 59, 159)
+                K.curses.doupdate()
+                result["times"].append(time.perf_counter() - start)
+            K.curses.endwin()
+        except Exception as e:
+            result["error"] = str(e)
+        finally:
+            os.write(wfd, json.dumps(result).encode("UTF8"))
+            os._exit(0)
+    os.close(wfd)
+    # drain the terminal output so the child never blocks
+    while True:
+        try:
+            if not os.read(master, 65536):
+                break
+        except OSError:
+            break
+    os.waitpid(pid, 0)
+    data = b""
+    while True:
+        chunk = os.read(rfd, 65536)
+        if not chunk:
+            break
+        data += chunk
+    os.close(rfd)
+    os.close(master)
+    result = json.loads(data or b'{"times": [], "error": "no result"}')
+    if "error" in result:
+        print("render: ERROR %s" % result["error"], file=sys.stderr)
+    return result["times"]
+
+def bench_size(results, nsyms, args, outdir):
+    print("%d symbols: generating" % nsyms, file=sys.stderr)
+    tree, work = genkconfig.generate(outdir, nsyms, args.depth, args.fanin, 2, [args.arch], args.seed, args.probes)
+    os.chdir(work)
+    K.cachedir = os.path.join(outdir, "cache")
+    K.args = K.parser.parse_args(["--arch", args.arch])
+    K.setup()
+    K.kconf_lru.clear()
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 100000))
+
+    def add(name, times):
+        if not times:
+            return
+        results.append({
+            "symbols": nsyms,
+            "bench": name,
+            "repeat": len(times),
+            "min": min(times),
+            "median": statistics.median(times),
+            "max": max(times),
+        })
+        print("%d symbols: %-12s min %.4fs median %.4fs" % (nsyms, name, min(times), statistics.median(times)), file=sys.stderr)
+
+    kconfs = []
+    # as load_kconf() does it
+    add("parse", timeit(args.repeat, lambda: kconfs.append(K.without_gc(lambda: kconfiglib.Kconfig("Kconfig", warn=False)))))
+    kconf = kconfs[-1]
+    path = K.kconf_cache_path()
+    add("cache_save", timeit(args.repeat, lambda: K.kconf_cache_save(path, kconf)))
+    add("cache_load", timeit(args.repeat, lambda: K.kconf_cache_load(path)))
+    del kconfs[:]
+
+    K.kconf_lru[(K.sourcedir, args.arch)] = kconf
+    add("load_config", timeit(args.repeat, lambda: K.load_defconfig(args.arch, "gen0_defconfig")))
+    state = {}
+    def rows():
+        state["symrows"] = K.SymRows(kconf, [])
+        state["tags"] = K.SymTags(kconf, "gen0_defconfig")
+    add("rows", timeit(args.repeat, rows))
+    if not args.no_render:
+        add("render", time_render(args.repeat, kconf, state["symrows"], state["tags"]))
+    def search():
+        searcher = K.SymSearch(kconf)
+        searcher.find("S1", False)
+        searcher.find("group 1", True)
+    add("search", timeit(args.repeat, search))
+    names = [sym.name for sym in kconf.unique_defined_syms[:1000]]
+    def config_set():
+        for name in names:
+            K.config_set(name, "debug", "gen0_defconfig", True)
+        K.tagstore.compact()
+    add("config_set", timeit(args.repeat, config_set))
+    out = os.path.join(work, "out")
+    def write():
+        K.write_if_changed(out + ".defconfig", K.config_text(kconf))
+        K.write_if_changed(out + ".full", K.config_text(kconf, full=True, skip_empty=True))
+    def clean():
+        for suffix in [".defconfig", ".full"]:
+            if os.path.exists(out + suffix):
+                os.unlink(out + suffix)
+    add("write", timeit(args.repeat, write, clean))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark kconfigizer on synthetic Kconfig trees")
+    parser.add_argument("--sizes", help="numbers of symbols (comma separated)", type=str, default="1000,10000,50000")
+    parser.add_argument("--repeat", "-r", help="runs of each benchmark", type=int, default=3)
+    parser.add_argument("--depth", help="length of the depends on chains", type=int, default=4)
+    parser.add_argument("--fanin", help="number of selectors of each selected symbol", type=int, default=3)
+    parser.add_argument("--arch", help="arch of the generated trees", type=str, default="x86")
+    parser.add_argument("--seed", help="random seed", type=int, default=1)
+    parser.add_argument("--probes", help="compiler probes in the generated trees, a kernel has about 100", type=int, default=0)
+    parser.add_argument("--no-render", help="skip the curses render benchmark", action="store_true")
+    parser.add_argument("--output", "-o", help="write the JSON results to this file instead of stdout", type=str, default=None)
+    parser.add_argument("--keep", help="keep the generated trees in this directory", type=str, default=None)
+    args = parser.parse_args()
+
+    results = []
+    topdir = args.keep or tempfile.mkdtemp(prefix="kconfigizer-bench-")
+    try:
+        for size in args.sizes.split(","):
+            bench_size(results, int(size), args, os.path.join(topdir, size))
+            # the tag store of this size must be written before its tree goes
+            K.tagstore.close()
+    finally:
+        if not args.keep:
+            shutil.rmtree(topdir, ignore_errors=True)
+    report = {
+        "version": 1,
+        "python": platform.python_version(),
+        "kconfiglib": ".".join(str(v) for v in kconfiglib.VERSION),
+        "depth": args.depth,
+        "fanin": args.fanin,
+        "probes": args.probes,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, 'w') as rfile:
+            json.dump(report, rfile, indent=1)
+    else:
+        print(json.dumps(report, indent=1))
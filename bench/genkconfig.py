@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+# Generate a synthetic kernel-like tree (Makefile, Kconfig files, defconfigs)
+# and a kconfigizer work directory (configs.yaml with some tags) pointing to it:
+#   OUTDIR/tree  the source tree
+#   OUTDIR/work  the directory to run kconfigizer from
+
+import argparse
+import os
+import random
+
+import yaml
+
+TYPES = ["bool"] * 14 + ["tristate"] * 4 + ["string", "int"]
+# symbols per drivers/dNNN/Kconfig file
+PER_FILE = 500
+
+def sym_name(i):
+    if i % 20 == 0:
+        return "DEBUG_S%d" % i
+    return "S%d" % i
+
+def generate(outdir, nsyms=1000, depth=4, fanin=3, ndefconfigs=4, arches=["x86"], seed=1, probes=0):
+    rnd = random.Random(seed)
+    tree = os.path.join(outdir, "tree")
+    work = os.path.join(outdir, "work")
+    os.makedirs(tree, exist_ok=True)
+    os.makedirs(work, exist_ok=True)
+    with open(os.path.join(tree, "Makefile"), 'w') as mfile:
+        mfile.write("VERSION = 6\nPATCHLEVEL = 1\nSUBLEVEL = 0\nEXTRAVERSION = -synthetic\n")
+
+    types = [rnd.choice(TYPES) for i in range(nsyms)]
+    # depends on: chains of depth symbols, each one depending on the previous
+    # one of its chain (sometimes or'ed with another earlier symbol)
+    deps = {}
+    for i in range(nsyms):
+        if i % depth == 0 or types[i - 1] not in ("bool", "tristate"):
+            continue
+        dep = sym_name(i - 1)
+        if i > depth and rnd.random() < 0.2:
+            other = rnd.randrange(0, i - 1)
+            if types[other] in ("bool", "tristate"):
+                dep = "%s || %s" % (dep, sym_name(other))
+        deps[i] = dep
+    # select: hidden targets, each selected by fanin visible bool symbols
+    selects = {}
+    bools = [i for i in range(nsyms) if types[i] == "bool"]
+    ntargets = max(nsyms // (4 * max(fanin, 1)), 1)
+    for t in range(ntargets):
+        for i in rnd.sample(bools, min(fanin, len(bools))):
+            selects.setdefault(i, []).append("T%d" % t)
+
+    files = []
+    for start in range(0, nsyms, PER_FILE):
+        dname = "drivers/d%03d" % (start // PER_FILE)
+        os.makedirs(os.path.join(tree, dname), exist_ok=True)
+        files.append("%s/Kconfig" % dname)
+        with open(os.path.join(tree, dname, "Kconfig"), 'w') as kfile:
+            kfile.write('menu "Drivers %d"\n\n' % (start // PER_FILE))
+            for i in range(start, min(start + PER_FILE, nsyms)):
+                kfile.write("config %s\n" % sym_name(i))
+                kfile.write('\t%s "Synthetic option %d"\n' % (types[i], i))
+                if i in deps:
+                    kfile.write("\tdepends on %s\n" % deps[i])
+                for target in selects.get(i, []):
+                    kfile.write("\tselect %s\n" % target)
+                if types[i] == "string":
+                    kfile.write('\tdefault "value%d"\n' % i)
+                elif types[i] == "int":
+                    kfile.write("\tdefault %d\n" % i)
+                elif rnd.random() < 0.5:
+                    kfile.write("\tdefault y\n")
+                kfile.write("\thelp\n\t  Synthetic option number %d, group %d.\n\n" % (i, i // depth))
+            kfile.write("endmenu\n")
+    with open(os.path.join(tree, "drivers", "Kconfig.targets"), 'w') as kfile:
+        for t in range(ntargets):
+            kfile.write("config T%d\n\tbool\n\n" % t)
+
+    with open(os.path.join(tree, "Kconfig"), 'w') as kfile:
+        kfile.write('mainmenu "Linux/$(ARCH) $(KERNELVERSION) Kernel Configuration"\n\n')
+        kfile.write('source "arch/$(SRCARCH)/Kconfig"\n\n')
+        kfile.write('config MODULES\n\tbool "Enable loadable module support"\n\toption modules\n\tdefault y\n\n')
+        # compiler probes run at parse time, as the cc-option/as-instr ones of
+        # scripts/Kconfig.include
+        if probes:
+            kfile.write('if-success = $(shell,{ $(1); } >/dev/null 2>&1 && echo "$(2)" || echo "$(3)")\n')
+            kfile.write("success = $(if-success,$(1),y,n)\n\n")
+        for i in range(probes):
+            kfile.write("config CC_PROBE_%d\n\tdef_bool $(success,$(CC) -Werror -S -x c /dev/null -o /dev/null)\n\n" % i)
+        for fname in files:
+            kfile.write('source "%s"\n' % fname)
+        kfile.write('source "drivers/Kconfig.targets"\n')
+
+    for arch in arches:
+        os.makedirs(os.path.join(tree, "arch", arch, "configs"), exist_ok=True)
+        with open(os.path.join(tree, "arch", arch, "Kconfig"), 'w') as kfile:
+            kfile.write("config ARCH_%s\n\tdef_bool y\n" % arch.upper())
+        for d in range(ndefconfigs):
+            with open(os.path.join(tree, "arch", arch, "configs", "gen%d_defconfig" % d), 'w') as dfile:
+                for i in sorted(rnd.sample(range(nsyms), max(nsyms // 20, 1))):
+                    if types[i] == "string":
+                        dfile.write('CONFIG_%s="defconfig%d"\n' % (sym_name(i), d))
+                    elif types[i] == "int":
+                        dfile.write("CONFIG_%s=%d\n" % (sym_name(i), rnd.randrange(1000)))
+                    elif rnd.random() < 0.3:
+                        dfile.write("# CONFIG_%s is not set\n" % sym_name(i))
+                    elif types[i] == "tristate" and rnd.random() < 0.5:
+                        dfile.write("CONFIG_%s=m\n" % sym_name(i))
+                    else:
+                        dfile.write("CONFIG_%s=y\n" % sym_name(i))
+
+    configs = {"base": {"sources": {"default": {"path": os.path.abspath(tree)}}}, "configs": {}}
+    for i in range(0, nsyms, 20):
+        configs["configs"][sym_name(i)] = {"debug": True}
+    for i in rnd.sample(range(nsyms), max(nsyms // 100, 1)):
+        configs["configs"].setdefault(sym_name(i), {})["harden"] = True
+    for i in rnd.sample(range(nsyms), max(nsyms // 100, 1)):
+        configs["configs"].setdefault(sym_name(i), {})["gen0_defconfig"] = {"need": True}
+    with open(os.path.join(work, "configs.yaml"), 'w') as cfile:
+        yaml.dump(configs, cfile, default_flow_style=False)
+    return tree, work
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic Kconfig tree")
+    parser.add_argument("outdir", help="output directory")
+    parser.add_argument("--symbols", "-n", help="number of symbols", type=int, default=1000)
+    parser.add_argument("--depth", help="length of the depends on chains", type=int, default=4)
+    parser.add_argument("--fanin", help="number of selectors of each selected symbol", type=int, default=3)
+    parser.add_argument("--defconfigs", help="number of defconfigs per arch", type=int, default=4)
+    parser.add_argument("--arch", help="arches (comma separated)", type=str, default="x86")
+    parser.add_argument("--seed", help="random seed", type=int, default=1)
+    parser.add_argument("--probes", help="number of compiler probes ($(success,$(CC) ...)) run by the parse", type=int, default=0)
+    args = parser.parse_args()
+    tree, work = generate(args.outdir, args.symbols, args.depth, args.fanin, args.defconfigs, args.arch.split(","), args.seed, args.probes)
+    print("Tree in %s, run kconfigizer from %s" % (tree, work))
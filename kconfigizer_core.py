@@ -0,0 +1,3353 @@
+import argparse
+import atexit
+import bisect
+import collections
+import gc
+import json
+import os
+import sys
+import re
+import signal
+import hashlib
+import mmap
+import threading
+import time
+import zlib
+from array import array
+
+import curses
+from curses import wrapper
+# yaml, concurrent.futures, pickle, socket, socketserver and subprocess are
+# only needed by some modes and slow to import, they are imported where used
+import kconfiglib
+from kconfiglib import EQUAL, AND, OR, UNEQUAL, STRING, HEX, INT, LESS_EQUAL, expr_value, NOT, expr_str, Symbol, STR_TO_TRI
+from kconfiglib import BOOL, TRISTATE, TRI_TO_STR, expr_items
+
+L_RED = 1
+L_GREEN = 2
+L_BLUE = 3
+L_WHITE = 4
+L_CYAN = 5
+L_YELLOW = 6
+L_TGT = 7
+L_INPUT = 8
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--source", "-s", help="sourcename", type=str, default="default")
+parser.add_argument("--arch", "-a", help="arch", type=str, default=None)
+parser.add_argument("--defconfig", "-D", help="defconfig", type=str, default=None)
+parser.add_argument("--quiet", "-q", help="Quiet, do not print build log", action="store_true")
+parser.add_argument("--debug", "-d", help="Quiet, do not print build log", action="store_true")
+parser.add_argument("--local", "-l", help="Use local tree", action="store_true")
+parser.add_argument("--no-cache", help="Do not use the Kconfig parse cache", action="store_true")
+parser.add_argument("--rebuild-cache", help="Ignore and rewrite the Kconfig parse cache", action="store_true")
+parser.add_argument("--watch", help="Reload the Kconfig files when they change, keeping the edits", action="store_true")
+parser.add_argument("--lru", help="Number of parsed arches kept in memory", type=int, default=4)
+parser.add_argument("--batch", help="Process all defconfigs of --arch (comma separated, default all arches) without UI", action="store_true")
+parser.add_argument("--jobs", "-j", help="Number of worker processes for --batch and --matrix", type=int, default=os.cpu_count())
+parser.add_argument("--matrix", help="Build/update the symbol x defconfig value matrix of --arch", action="store_true")
+parser.add_argument("--matrix-enables", help="List defconfigs of --arch enabling SYMBOL", type=str, default=None, metavar="SYMBOL")
+parser.add_argument("--matrix-diff", help="List symbols whose value differ between two defconfigs of --arch", nargs=2, default=None, metavar="DEFCONFIG")
+parser.add_argument("--profile", help="Show timing percentiles in the header and write kconfigizer-trace.json on exit", action="store_true")
+parser.add_argument("--overwrite", help="Apply the tag policy to the defconfigs of --arch (all arches by default) or --defconfig (comma separated) and rewrite the changed ones", action="store_true")
+parser.add_argument("--serve", help="Keep parsed trees resident and answer JSON queries on --socket", action="store_true", default=False)
+parser.add_argument("--client", help="Send the JSON queries read on stdin to the --serve daemon", action="store_true", default=False)
+parser.add_argument("--socket", help="Unix socket of --serve/--client (default kconfigizer.sock)", type=str, default=None)
+parser.add_argument("--minimize", help="Disable all debug tagged configs of --arch/--defconfig and write the minimal defconfig", action="store_true", default=False)
+parser.add_argument("--impact", help="List what disabling SYMBOL in --arch/--defconfig would turn off", type=str, default=None, metavar="SYMBOL")
+parser.add_argument("--footprint", help="List the source files count and bytes built by each symbol (enabled in --arch/--defconfig if given), biggest first", action="store_true")
+parser.add_argument("--harden", help="Report the state of the harden tagged configs in every defconfig of --arch (comma separated, default all arches) or --defconfig (comma separated)", action="store_true")
+parser.add_argument("--format", help="Output format of --harden and --compare", choices=["csv", "json"], default="csv")
+parser.add_argument("--compare", help="List the symbols added, removed, whose default or --arch/--defconfig value changed from source SRC_A to SRC_B", nargs=2, default=None, metavar=("SRC_A", "SRC_B"))
+parser.add_argument("--matrix-debug", help="List debug tagged symbols enabled in any defconfig of --arch", action="store_true")
+args = None
+profiler = None
+configdir = None
+configs = None
+tagstore = None
+sourcedir = None
+
+# --profile: durations of the interesting steps, the last ones of each kind
+# for the percentiles and all of them (up to a limit) as a trace, written in
+# the Chrome trace event format (chrome://tracing, Perfetto) on exit.
+class Profiler:
+    def __init__(self, window=200, limit=100000):
+        self.origin = time.perf_counter()
+        self.samples = {}
+        self.window = window
+        self.events = collections.deque(maxlen=limit)
+        # the loader thread records too
+        self.lock = threading.Lock()
+
+    def add(self, name, start, end):
+        with self.lock:
+            if name not in self.samples:
+                self.samples[name] = collections.deque(maxlen=self.window)
+            self.samples[name].append(end - start)
+            self.events.append((name, start, end, threading.get_ident()))
+
+    def percentiles(self, name):
+        with self.lock:
+            values = sorted(self.samples.get(name, []))
+        if not values:
+            return None
+        return [values[min(int(len(values) * q), len(values) - 1)] for q in (0.5, 0.95, 0.99)]
+
+    def hud(self):
+        parts = []
+        for name in ["frame", "key", "parse", "cache_load", "load_config", "search", "yaml_load", "yaml_write"]:
+            pcts = self.percentiles(name)
+            if pcts:
+                parts.append("%s %.1f/%.1f/%.1f" % (name, pcts[0] * 1000, pcts[1] * 1000, pcts[2] * 1000))
+        return "p50/p95/p99 ms: " + " ".join(parts)
+
+    def dump(self, path):
+        trace = []
+        with self.lock:
+            events = list(self.events)
+        for name, start, end, tid in events:
+            trace.append({"name": name, "ph": "X", "pid": os.getpid(), "tid": tid, "ts": (start - self.origin) * 1e6, "dur": (end - start) * 1e6})
+        with open(path, 'w') as tfile:
+            json.dump({"traceEvents": trace}, tfile)
+
+# record the step name started at start (a time.perf_counter()) when profiling
+def profile_add(name, start):
+    if profiler is not None:
+        profiler.add(name, start, time.perf_counter())
+
+# Write path via a temp file and an atomic rename so that a reader never sees
+# a partial file, write(file) fills the temp file. The temp file is removed
+# if anything fails.
+def write_atomic(path, write, mode='w', sync=False):
+    tmp = "%s.%d.tmp" % (path, os.getpid())
+    try:
+        with open(tmp, mode) as wfile:
+            write(wfile)
+            if sync:
+                wfile.flush()
+                os.fsync(wfile.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+# libyaml bindings are much faster than the pure python loader/dumper
+def yaml_load(stream):
+    import yaml
+    return yaml.load(stream, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+def yaml_dump(data, stream):
+    import yaml
+    yaml.dump(data, stream, Dumper=getattr(yaml, "CDumper", yaml.Dumper), default_flow_style=False)
+
+# configs.yaml with write-behind: tag edits are applied in memory and appended
+# to a small journal, configs.yaml is only rewritten (via a temp file and an
+# atomic rename) a few seconds after the last edit and on exit, by one writer
+# thread started on the first edit.
+# A journal left by a crash is replayed on the next load.
+# A JSON copy of configs.yaml in the cache dir, valid while configs.yaml keeps
+# its mtime and size, avoids importing yaml at all on startup.
+class TagStore:
+    def __init__(self, path, delay=2.0):
+        self.path = path
+        self.journal = path + ".journal"
+        self.delay = delay
+        self.lock = threading.RLock()
+        self.cond = threading.Condition(self.lock)
+        # monotonic time of the next rewrite, None when nothing is due
+        self.deadline = None
+        self.writer = None
+        self.pending = False
+        self.configs = None
+        key = hashlib.sha1(os.path.abspath(path).encode("UTF8")).hexdigest()
+        self.snapshot = os.path.join(cachedir, "configs-%s.json" % key)
+
+    def stamp(self):
+        st = os.stat(self.path)
+        return [st.st_mtime_ns, st.st_size]
+
+    def load(self):
+        start = time.perf_counter()
+        stamp = self.stamp()
+        self.configs = None
+        try:
+            with open(self.snapshot) as sfile:
+                snapshot = json.load(sfile)
+            if snapshot["stamp"] == stamp:
+                self.configs = snapshot["configs"]
+        except (OSError, ValueError, KeyError):
+            pass
+        if self.configs is None:
+            with open(self.path) as configfile:
+                self.configs = yaml_load(configfile)
+            if self.configs is None:
+                self.configs = {}
+            self.save_snapshot(stamp)
+        profile_add("yaml_load", start)
+        try:
+            with open(self.journal) as jfile:
+                for line in jfile:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # truncated last line
+                        continue
+                    if isinstance(entry, dict):
+                        self.apply_filter(entry["filter"], entry["expr"])
+                    else:
+                        self.apply(*entry)
+                    self.pending = True
+        except IOError:
+            pass
+        return self.configs
+
+    def apply(self, name, typ, defconfig, xset):
+        if "configs" not in self.configs:
+            self.configs["configs"] = {}
+        if name not in self.configs["configs"]:
+            self.configs["configs"][name] = {}
+        if defconfig:
+            if not defconfig in self.configs["configs"][name]:
+                self.configs["configs"][name][defconfig] = {}
+            self.configs["configs"][name][defconfig][typ] = xset
+        else:
+            self.configs["configs"][name][typ] = xset
+
+    # saved filter expressions, expr None removes name
+    def apply_filter(self, name, expr):
+        filters = self.configs.setdefault("filters", {})
+        if expr is None:
+            filters.pop(name, None)
+        else:
+            filters[name] = expr
+
+    def set(self, name, typ, defconfig, xset):
+        with self.lock:
+            self.apply(name, typ, defconfig, xset)
+            self.log([name, typ, defconfig, xset])
+
+    def set_filter(self, name, expr):
+        with self.lock:
+            self.apply_filter(name, expr)
+            self.log({"filter": name, "expr": expr})
+
+    def log(self, entry):
+        with self.lock:
+            with open(self.journal, 'a') as jfile:
+                jfile.write(json.dumps(entry) + "\n")
+            self.pending = True
+            self.deadline = time.monotonic() + self.delay
+            if self.writer is None:
+                self.writer = threading.Thread(target=self.run, daemon=True)
+                self.writer.start()
+            self.cond.notify()
+
+    # writer thread: rewrite configs.yaml once the deadline passed without edit
+    def run(self):
+        with self.lock:
+            while True:
+                if self.deadline is None:
+                    self.cond.wait()
+                    continue
+                delay = self.deadline - time.monotonic()
+                if delay > 0:
+                    self.cond.wait(delay)
+                    continue
+                self.deadline = None
+                self.compact()
+
+    def compact(self):
+        with self.lock:
+            if not self.pending:
+                return
+            start = time.perf_counter()
+            write_atomic(self.path, lambda rfile: yaml_dump(self.configs, rfile), sync=True)
+            self.save_snapshot(self.stamp())
+            profile_add("yaml_write", start)
+            try:
+                os.unlink(self.journal)
+            except OSError:
+                pass
+            self.pending = False
+
+    # only if JSON gives back the same data (no dates, no int keys...)
+    def save_snapshot(self, stamp):
+        try:
+            data = json.dumps({"stamp": stamp, "configs": self.configs})
+            if json.loads(data)["configs"] != self.configs:
+                return
+            os.makedirs(cachedir, exist_ok=True)
+            write_atomic(self.snapshot, lambda sfile: sfile.write(data))
+        except (OSError, TypeError, ValueError):
+            pass
+
+    def close(self):
+        with self.lock:
+            self.deadline = None
+            self.compact()
+
+# version of the source tree as "make kernelversion" prints it, read from the
+# head of the top Makefile instead of running make
+kernelversions = {}
+
+def kernelversion(srcdir):
+    if srcdir in kernelversions:
+        return kernelversions[srcdir]
+    fields = {}
+    try:
+        with open(os.path.join(srcdir, "Makefile")) as mfile:
+            for line in mfile.read(4096).splitlines():
+                m = re.match(r"^(VERSION|PATCHLEVEL|SUBLEVEL|EXTRAVERSION)\s*=\s*(\S*)", line)
+                if m and m.group(1) not in fields:
+                    fields[m.group(1)] = m.group(2)
+    except OSError:
+        pass
+    if fields.get("VERSION"):
+        version = fields["VERSION"]
+        if fields.get("PATCHLEVEL"):
+            version += "." + fields["PATCHLEVEL"]
+            if fields.get("SUBLEVEL"):
+                version += "." + fields["SUBLEVEL"]
+        version += fields.get("EXTRAVERSION", "")
+    else:
+        # not a Makefile we understand, let make tell
+        import subprocess
+        version = subprocess.check_output("make -s kernelversion", shell=True, cwd=srcdir).decode("UTF8").strip()
+    kernelversions[srcdir] = version
+    return version
+
+# read configs.yaml of the current directory and enter the source tree
+def setup():
+    global configdir, configs, tagstore
+    configdir = os.path.expandvars(os.getcwd())
+    tagstore = TagStore("%s/configs.yaml" % configdir)
+    try:
+        configs = tagstore.load()
+    except IOError:
+        configs = {}
+        configs["configs"] = {}
+        configs["base"] = {}
+        configs["base"]["sources"] = {}
+        if args.local:
+            configs["base"]["sources"]["local"] = {}
+            configs["base"]["sources"]["local"]["path"] = os.getcwd()
+            args.source = "local"
+        print("GENERATED")
+        print(configs)
+        tagstore.configs = configs
+    atexit.register(tagstore.close)
+
+    if not "base" in configs:
+        print("ERROR: need base in %s/configs.yaml" % configdir)
+        sys.exit(0)
+    if not "sources" in configs["base"]:
+        print("ERROR: need base/sources in %s/configs.yaml" % configdir)
+        sys.exit(0)
+
+    if not args.source in configs["base"]["sources"]:
+        print("ERROR: did not find %s in base/sources in %s/configs.yaml" % (args.source, configdir))
+        sys.exit(0)
+    if not "path" in configs["base"]["sources"][args.source]:
+        print("ERROR: did not find path in base/sources/%s in %s/configs.yaml" % (args.source, configdir))
+        sys.exit(0)
+
+    enter_source(args.source)
+
+# make the source name of base/sources the current one
+def enter_source(name):
+    global sourcedir
+    sourcedir = configs["base"]["sources"][name]["path"]
+    os.chdir(sourcedir)
+
+    os.environ["srctree"] = sourcedir
+    if args.arch:
+        os.environ["ARCH"] = args.arch
+        os.environ["SRCARCH"] = args.arch
+    os.environ["RUSTC"] = 'rustc'
+    os.environ["CC"] = 'gcc'
+    os.environ["LD"] = 'ld'
+    os.environ["HOSTCC"] = 'gcc'
+    os.environ["HOSTCXX"] = 'g++'
+    os.environ["KERNELVERSION"] = kernelversion(sourcedir)
+
+def my_sc_expr_str(sc):
+    """
+    Standard symbol/choice printing function. Uses plain Kconfig syntax, and
+    displays choices as <choice> (or <choice NAME>, for named choices).
+
+    See expr_str().
+    """
+    if sc.__class__ is Symbol:
+        if sc.is_constant and sc.name not in STR_TO_TRI:
+            return '"{}"'.format(kconfiglib.escape(sc.name))
+        return sc.name + ":" + sc.str_value
+
+    return "<choice {}>".format(sc.name) if sc.name else "<choice>"
+
+# THIS IS MADNESS
+def dprint(x):
+    first = False
+    second = False
+    s1 = x[1]
+    if type(x[1]) == tuple:
+        st1 = dprint(x[1])
+        if st1 != "":
+            first = True
+    if type(x[1]) == kconfiglib.Symbol:
+        s = x[1]
+        if args.debug:
+            print("selected by %s %s" % (s.name, s.str_value))
+        if s.str_value != 'n':
+            first = True
+            st1 = "%s:%s" % (s.name, s.str_value)
+        if s.str_value == s.name:
+            first = True
+            st1 = "!%s" % s.name
+        if x[0] == AND and not first:
+            return ""
+        #print("ST1: %s" % st1)
+    if len(x) == 2:
+        if first:
+            return st1
+        return ""
+    s2 = x[2]
+    if type(x[2]) == kconfiglib.Symbol:
+        s = x[2]
+        if args.debug:
+            print("2 selected by %s %s" % (s.name, s.str_value))
+        if s.str_value != 'n':
+            second = True
+            st2 = "%s:%s" % (s.name, s.str_value)
+        if s.str_value == s.name:
+            second = True
+            st2 = "!%s" % s.name
+    if type(x[2]) == tuple:
+        st2 = dprint(x[2])
+        if st2 != "":
+            second = True
+    if x[0] == AND:
+        if not second:
+            return ""
+        fs = st1 + " AND " + st2
+        return fs
+    elif x[0] == OR:
+        if not first and not second:
+            return ""
+        if not first and second:
+            return st2
+        if first and not second:
+            return st1
+        fs = st1 + " OR " + st2
+        return fs
+    elif x[0] == EQUAL:
+        if s1.str_value == s2.str_value:
+            return "%s = %s" % (s1.name, s2.name)
+        return ""
+    elif x[0] == UNEQUAL:
+        if s1.str_value != s2.str_value:
+            return "%s = %s" % (s1.name, s2.name)
+        return ""
+    elif x[0] == LESS_EQUAL:
+        b = expr_value(x)
+        if b == 2:
+            fs = "%s:%s <= %s" % (s1.name, s1.str_value, s2.str_value)
+        else:
+            fs = "%s:%s > %s" % (s1.name, s1.str_value, s2.str_value)
+        return fs
+    else:
+        print("UNKNOWN %d" % x[0])
+        if args.debug:
+            sys.exit(0)
+    return "ERROR"
+
+def prdep(sym):
+    if not sym.rev_dep:
+        return ""
+    if type(sym.rev_dep) == kconfiglib.Symbol:
+        if sym.rev_dep.name == "n":
+            return ""
+        return "SELECTED by %s:%s" % (sym.rev_dep.name, sym.str_value)
+    return dprint(sym.rev_dep)
+
+def deprint(x):
+    if type(x) == kconfiglib.Choice:
+        return "%s:%s" % (x.name, x.str_value)
+    s1 = x[1]
+    if type(x[1]) == tuple:
+        st1 = deprint(x[1])
+    if type(x[1]) == kconfiglib.Symbol:
+        s = x[1]
+        if args.debug:
+            print("depend on %s %s" % (s.name, s.str_value))
+        if s.str_value == 'n':
+            st1 = "%s:%s" % (s.name, s.str_value)
+        st1 = "%s:%s" % (s.name, s.str_value)
+        if s.str_value == s.name:
+            st1 = "!%s" % s.name
+        #print("ST1: %s" % st1)
+    if len(x) == 2:
+        if x[0] == NOT:
+            print(x)
+            return "%s!=%s" % (s.name, s.str_value)
+        return st1
+    s2 = x[2]
+    if type(x[2]) == kconfiglib.Choice:
+        st2 = "%s:%s" % (x[2].name, x[2].str_value)
+    if type(x[2]) == kconfiglib.Symbol:
+        s = x[2]
+        if args.debug:
+            print("2 depend on %s %s" % (s.name, s.str_value))
+        if s.str_value == 'n':
+            st2 = "%s:%s" % (s.name, s.str_value)
+        st2 = "%s:%s" % (s.name, s.str_value)
+        if s.str_value == s.name:
+            st2 = "!%s" % s.name
+    if type(x[2]) == tuple:
+        st2 = deprint(x[2])
+    if x[0] == AND:
+        fs = st1 + " AND " + st2
+        return fs
+    elif x[0] == OR:
+        fs = st1 + " OR " + st2
+        return fs
+    elif x[0] == EQUAL:
+        if x[1].str_value != s2.str_value:
+            return "%s = %s" % (s1.name, s2.name)
+        return ""
+    elif x[0] == UNEQUAL:
+        if x[1].str_value == s2.str_value:
+            return "%s = %s" % (s1.name, s2.name)
+        return ""
+    else:
+        print("UNKNOWN %d" % x[0])
+    return "ERROR"
+
+
+def directdep(sym):
+    if not sym.direct_dep:
+        return ""
+    if type(sym.direct_dep) == kconfiglib.Symbol:
+        if sym.direct_dep.name == 'y':
+            return ""
+        return "DEPENDS on %s:%s" % (sym.direct_dep.name, sym.direct_dep.str_value)
+    return "DEPENDS on %s" % deprint(sym.direct_dep)
+
+def config_set(name, typ, defconfig, xset):
+    tagstore.set(name, typ, defconfig, xset)
+
+def config_get(name, defconfig, typ):
+    if name not in configs["configs"]:
+        return False
+    if defconfig and defconfig in configs["configs"][name]:
+        if typ in configs["configs"][name][defconfig]:
+            return configs["configs"][name][defconfig][typ]
+    if typ in configs["configs"][name]:
+        return configs["configs"][name][typ]
+    return False
+
+TAG_DEBUG = 1
+TAG_HARDEN = 2
+TAG_NEED = 4
+TAG_TYPES = [("debug", TAG_DEBUG), ("harden", TAG_HARDEN), ("need", TAG_NEED)]
+
+# tags of configs.yaml resolved once for a defconfig (per defconfig values
+# override the global ones as in config_get()), one byte of TAG_* bits per
+# symbol of unique_defined_syms
+class SymTags:
+    def __init__(self, kconf, defconfig):
+        self.syms = kconf.unique_defined_syms
+        self.defconfig = defconfig
+        self.index = {}
+        for i, sym in enumerate(self.syms):
+            self.index[sym.name] = i
+        self.bits = bytearray(len(self.syms))
+        # built in the Loader thread while the UI may add tags
+        for name in list(configs.get("configs", {})):
+            self.refresh(name)
+
+    # recompute the slot of one symbol after a config_set()
+    def refresh(self, name):
+        i = self.index.get(name)
+        if i is None:
+            return
+        bits = 0
+        for typ, bit in TAG_TYPES:
+            if config_get(name, self.defconfig, typ):
+                bits |= bit
+        self.bits[i] = bits
+
+    # positions of all symbols having one of the mask bits
+    def indices(self, mask):
+        table = bytes([1 if b & mask else 0 for b in range(256)])
+        return [m.start() for m in re.finditer(b"\x01", self.bits.translate(table))]
+
+    def count_enabled(self, mask):
+        n = 0
+        for i in self.indices(mask):
+            if self.syms[i].str_value not in ('n', ''):
+                n += 1
+        return n
+
+# Set (or unset with None) the user value of many symbols at once, usable
+# without the curses UI. kconfiglib evaluates lazily and stops invalidating at
+# already invalidated symbols, so the tree is only re-evaluated once, on the
+# next read of a value. Returns the symbols which were set.
+# The changes of user values are recorded in journal when given.
+def set_values(kconf, names, value, journal=None):
+    global values_generation
+    values_generation += 1
+    syms = []
+    for name in names:
+        sym = kconf.syms.get(name)
+        if sym is None or not sym.nodes:
+            continue
+        old = sym.user_value
+        choice = sym.choice
+        if choice is not None:
+            chold = choice_state(choice)
+        if value is None:
+            sym.unset_value()
+        else:
+            sym.set_value(value)
+        if journal is not None:
+            journal.record(sym, old, sym.user_value)
+            if choice is not None:
+                journal.record(choice, chold, choice_state(choice))
+        syms.append(sym)
+    return syms
+
+# y on a choice member also makes it the user selection of its choice, which
+# unset_value() on the member does not give back: the journal keeps the
+# (mode, selection) user state of the choice too
+def choice_state(choice):
+    return (choice.user_value, choice.user_selection)
+
+def set_choice_state(choice, state):
+    mode, selection = state
+    choice.unset_value()
+    if mode is not None:
+        choice.set_value(mode)
+    if selection is not None:
+        # set_value(2) selects, then give back the user value of the member
+        user = selection.user_value
+        selection.set_value(2)
+        if user is None:
+            selection.unset_value()
+        else:
+            selection.set_value(user)
+
+# Undo/redo history of the user values of a loaded defconfig. An action only
+# stores the (sym, old, new) user values of the symbols it changed (and the
+# choice_state() of their choices), undo and redo set them back without
+# reloading. A checkpoint is the id of the last
+# action done, restoring it walks the history back or forth to that action.
+class EditJournal:
+    def __init__(self, limit=10000):
+        self.limit = limit
+        self.done = []
+        self.undone = []
+        self.current = None
+        self.serial = 0
+        # id of the state before the oldest action kept
+        self.base = 0
+        self.checkpoints = {}
+
+    def begin(self):
+        self.current = {}
+
+    def record(self, sym, old, new):
+        if self.current is None:
+            return
+        if sym in self.current:
+            self.current[sym][1] = new
+        else:
+            self.current[sym] = [old, new]
+
+    def end(self):
+        delta = tuple((sym, old, new) for sym, (old, new) in self.current.items() if old != new)
+        self.current = None
+        if not delta:
+            return
+        self.serial += 1
+        self.done.append((self.serial, delta))
+        self.undone = []
+        if len(self.done) > self.limit:
+            self.base = self.done.pop(0)[0]
+
+    def apply(self, delta, undo):
+        global values_generation
+        values_generation += 1
+        syms = []
+        # choices first, selecting a member changes its user value
+        for item, old, new in delta:
+            if item.__class__ is kconfiglib.Choice:
+                set_choice_state(item, old if undo else new)
+                syms.append(item)
+        for sym, old, new in delta:
+            if sym.__class__ is kconfiglib.Choice:
+                continue
+            value = old if undo else new
+            if value is None:
+                sym.unset_value()
+            else:
+                sym.set_value(value)
+            syms.append(sym)
+        return syms
+
+    # returns the symbols changed back
+    def undo(self):
+        if not self.done:
+            return []
+        action = self.done.pop()
+        self.undone.append(action)
+        return self.apply(action[1], True)
+
+    def redo(self):
+        if not self.undone:
+            return []
+        action = self.undone.pop()
+        self.done.append(action)
+        return self.apply(action[1], False)
+
+    # move the history to a new parse of the same Kconfig: symbols are looked
+    # up by name, choices by their members, and the ones it touched get their
+    # current user value there, returns the symbols and choices set
+    def remap(self, kconf):
+        global values_generation
+        values_generation += 1
+        values = {}
+        def move_sym(sym):
+            if sym is None:
+                return None
+            nsym = kconf.syms.get(sym.name)
+            if nsym is None or not nsym.nodes:
+                return None
+            return nsym
+        def move_choice(choice):
+            for sym in choice.syms:
+                nsym = move_sym(sym)
+                if nsym is not None and nsym.choice is not None:
+                    return nsym.choice
+            return None
+        def move_state(state, nchoice):
+            selection = move_sym(state[1])
+            if selection is not None and selection.choice is not nchoice:
+                selection = None
+            return (state[0], selection)
+        def move(delta):
+            moved = []
+            for item, old, new in delta:
+                if item.__class__ is kconfiglib.Choice:
+                    nitem = move_choice(item)
+                    if nitem is None:
+                        continue
+                    if nitem not in values:
+                        values[nitem] = move_state(choice_state(item), nitem)
+                    moved.append((nitem, move_state(old, nitem), move_state(new, nitem)))
+                    continue
+                nitem = move_sym(item)
+                if nitem is None:
+                    continue
+                if nitem not in values:
+                    values[nitem] = item.user_value
+                moved.append((nitem, old, new))
+            return tuple(moved)
+        self.done = [(serial, move(delta)) for serial, delta in self.done]
+        self.undone = [(serial, move(delta)) for serial, delta in self.undone]
+        for item, value in values.items():
+            if item.__class__ is kconfiglib.Choice:
+                set_choice_state(item, value)
+        for item, value in values.items():
+            if item.__class__ is kconfiglib.Choice:
+                continue
+            if value is None:
+                item.unset_value()
+            else:
+                item.set_value(value)
+        return list(values)
+
+    def head(self):
+        if self.done:
+            return self.done[-1][0]
+        return self.base
+
+    def checkpoint(self, name):
+        self.checkpoints[name] = self.head()
+
+    # returns the symbols changed, None if the checkpoint is not reachable
+    # anymore (unknown, trimmed, or on a branch left by a new action)
+    def restore(self, name):
+        target = self.checkpoints.get(name)
+        if target is None:
+            return None
+        syms = []
+        if target == self.base or target in [serial for serial, delta in self.done]:
+            while self.head() != target:
+                syms += self.undo()
+        elif target in [serial for serial, delta in self.undone]:
+            while self.head() != target:
+                syms += self.redo()
+        else:
+            return None
+        return syms
+
+# incremented on every change of symbol values, stamps the info pane cache
+values_generation = 0
+info_cache = {}
+def_cache = {}
+
+# only the terms of an OR expression which are not n
+def active_terms(expr):
+    terms = []
+    for term in kconfiglib.split_expr(expr, OR):
+        if expr_value(term):
+            terms.append(expr_str(term, sc_expr_str_fn=my_sc_expr_str))
+    return " || ".join(terms)
+
+# lines of the info pane of a symbol as (line, text), only rendered again
+# after a change of the values
+def info_lines(sym):
+    global info_cache
+    entry = info_cache.get(sym)
+    if entry is not None and entry[0] == values_generation:
+        return entry[1]
+    if len(info_cache) > 4096:
+        info_cache = {}
+    lines = []
+    st = active_terms(sym.rev_dep)
+    if st:
+        lines.append((1, "SELECTED by %s" % st))
+    st = active_terms(sym.weak_rev_dep)
+    if st:
+        lines.append((3, "IMPLIED by %s" % st))
+    st = expr_str(sym.direct_dep, sc_expr_str_fn=my_sc_expr_str)
+    if st != "y:y":
+        lines.append((5, "DEPEND ON %s" % st))
+    # the definition does not depend on values
+    if sym not in def_cache:
+        def_cache[sym] = str(sym)
+    lines.append((10, def_cache[sym]))
+    info_cache[sym] = (values_generation, lines)
+    return lines
+
+def configable(sym):
+    if sym.user_value is None:
+        if sym.assignable:
+            return True
+        if args.debug:
+            print("========================")
+            print("NOT %s:%s" % (sym.name, sym.str_value))
+            print(sym.assignable)
+            print(directdep(sym))
+        #if sym.assignable or sym.type == 27:
+        return False
+    return True
+
+KCONF_CACHE_VERSION = 1
+cachedir = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "kconfigizer")
+
+# kconfiglib objects are deeply linked (menu nodes, expressions), pickling them
+# need a far bigger stack than the default one
+def run_big_stack(fn, *fargs):
+    result = {}
+    def runner():
+        try:
+            result["ret"] = fn(*fargs)
+        except Exception as e:
+            result["err"] = e
+    oldlimit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(oldlimit, 1000000))
+    try:
+        oldsize = threading.stack_size(512 * 1024 * 1024)
+        try:
+            th = threading.Thread(target=runner)
+            th.start()
+        finally:
+            threading.stack_size(oldsize)
+        th.join()
+    finally:
+        # the other threads keep their small stacks
+        sys.setrecursionlimit(oldlimit)
+    if "err" in result:
+        raise result["err"]
+    return result["ret"]
+
+# parsing, pickling and unpickling a tree allocate or walk millions of
+# objects, the cyclic GC would run many full collections finding nothing
+def without_gc(fn, *fargs):
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return fn(*fargs)
+    finally:
+        if enabled:
+            gc.enable()
+
+def kconf_cache_path():
+    key = "%s:%s:%s:%s" % (sourcedir, os.environ.get("ARCH"), os.environ.get("SRCARCH"), os.environ.get("KERNELVERSION"))
+    return os.path.join(cachedir, "%s.kconf" % hashlib.sha1(key.encode("UTF8")).hexdigest())
+
+# stamp of every Kconfig file (and their directories, for catching new files
+# matched by osource globs) plus the environment variables used while parsing
+def kconf_stamp(paths, env_vars):
+    files = {}
+    for path in paths:
+        try:
+            st = os.stat(os.path.join(sourcedir, path))
+            files[path] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            files[path] = None
+    env = {}
+    for var in sorted(env_vars):
+        env[var] = os.environ.get(var)
+    return {"files": files, "env": env}
+
+def kconf_paths(kconf):
+    paths = []
+    for fname in kconf.kconfig_filenames:
+        for path in [fname, os.path.dirname(fname) or "."]:
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+# the header at the start of a Kconfig cache file (the compressed pickled
+# tree follows it), None if it is stale
+def kconf_cache_header(cfile):
+    import pickle
+    header = pickle.load(cfile)
+    if header.get("version") != KCONF_CACHE_VERSION:
+        return None
+    if header["stamp"] != kconf_stamp(header["stamp"]["files"].keys(), header["stamp"]["env"].keys()):
+        return None
+    return header
+
+def kconf_cache_load(path):
+    import pickle
+    try:
+        with open(path, 'rb') as cfile:
+            if kconf_cache_header(cfile) is None:
+                return None
+            data = zlib.decompress(cfile.read())
+    except (OSError, EOFError, pickle.UnpicklingError, zlib.error, KeyError):
+        return None
+    try:
+        return without_gc(run_big_stack, pickle.loads, data)
+    except Exception:
+        return None
+
+def kconf_cache_save(path, kconf):
+    import pickle
+    # the bound readline of the last parsed file cannot be pickled
+    kconf._readline = None
+    header = {
+        "version": KCONF_CACHE_VERSION,
+        "stamp": kconf_stamp(kconf_paths(kconf), kconf.env_vars),
+    }
+    try:
+        data = zlib.compress(without_gc(run_big_stack, pickle.dumps, kconf, pickle.HIGHEST_PROTOCOL), 1)
+        os.makedirs(cachedir, exist_ok=True)
+
+        def write(cfile):
+            pickle.dump(header, cfile, protocol=pickle.HIGHEST_PROTOCOL)
+            cfile.write(data)
+        write_atomic(path, write, 'wb')
+    except (OSError, pickle.PicklingError, RecursionError) as e:
+        if args.debug:
+            print("WARNING: cannot write Kconfig cache %s: %s" % (path, e))
+
+def load_kconf(warn_to_stderr=False):
+    path = kconf_cache_path()
+    if not args.no_cache and not args.rebuild_cache:
+        start = time.perf_counter()
+        kconf = kconf_cache_load(path)
+        if kconf is not None:
+            kconf.warn_to_stderr = warn_to_stderr
+            profile_add("cache_load", start)
+            return kconf
+    start = time.perf_counter()
+    kconf = without_gc(lambda: kconfiglib.Kconfig("Kconfig", suppress_traceback=not args.debug, warn_to_stderr=warn_to_stderr))
+    profile_add("parse", start)
+    if not args.no_cache:
+        kconf_cache_save(path, kconf)
+    return kconf
+
+# parsed Kconfig trees kept resident, most recently used last
+# kconf_lru_lock is held for every access, the Loader thread fills it while
+# the UI looks at it
+kconf_lru = collections.OrderedDict()
+kconf_lru_lock = threading.Lock()
+
+def get_kconf(srcarch, warn_to_stderr=False):
+    key = (sourcedir, srcarch)
+    with kconf_lru_lock:
+        if key in kconf_lru:
+            kconf_lru.move_to_end(key)
+            return kconf_lru[key]
+    os.environ["ARCH"] = srcarch
+    os.environ["SRCARCH"] = srcarch
+    kconf = load_kconf(warn_to_stderr)
+    with kconf_lru_lock:
+        kconf_lru[key] = kconf
+        while len(kconf_lru) > max(args.lru, 1):
+            kconf_lru.popitem(last=False)
+    return kconf
+
+def kconf_resident(srcarch):
+    with kconf_lru_lock:
+        return (sourcedir, srcarch) in kconf_lru
+
+# reuse the resident Kconfig of the arch, load_config() replace all user values
+def load_defconfig(srcarch, defconfig, warn_to_stderr=False):
+    global values_generation
+    kconf = get_kconf(srcarch, warn_to_stderr)
+    kconf.warnings = []
+    start = time.perf_counter()
+    kconf.load_config("arch/%s/configs/%s" % (srcarch, defconfig))
+    profile_add("load_config", start)
+    values_generation += 1
+    return kconf
+
+# Filter expressions: atoms joined by & (or just a space), | and !, with
+# parentheses:
+#   =y =m =n          value
+#   set default       user value or not
+#   selected          selected by something (a select which is not n)
+#   type:bool         type (bool, tristate, string, int, hex)
+#   tag:debug         tag (debug, harden, need)
+#   name:REGEX        name (name:"A|B" when it has spaces or ()!&|)
+#   file:TEXT         defined in a file whose path contains TEXT
+# An expression is compiled once to a tree evaluated on bitsets (one Python
+# int per atom, bit i for unique_defined_syms[i]).
+FILTER_TOKEN = re.compile(r'\s*([()!&|]|[a-z]+:"[^"]*"|[^\s()!&|]+)')
+FILTER_VALUES = ["=y", "=m", "=n", "set", "default", "selected"]
+FILTER_TYPES = dict((name, typ) for typ, name in kconfiglib.TYPE_TO_STR.items() if name != "unknown")
+FILTER_TAGS = dict(TAG_TYPES)
+
+def compile_filter(text):
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        m = FILTER_TOKEN.match(text, pos)
+        if m is None:
+            raise ValueError("cannot parse %s" % text[pos:].strip())
+        tokens.append(m.group(1))
+        pos = m.end()
+    tokens.append(None)
+    pos = 0
+
+    def expr():
+        nonlocal pos
+        node = term()
+        while tokens[pos] == "|":
+            pos += 1
+            node = ("or", node, term())
+        return node
+
+    def term():
+        nonlocal pos
+        node = factor()
+        while tokens[pos] is not None and tokens[pos] not in ")|":
+            if tokens[pos] == "&":
+                pos += 1
+            node = ("and", node, factor())
+        return node
+
+    def factor():
+        nonlocal pos
+        token = tokens[pos]
+        pos += 1
+        if token == "!":
+            return ("not", factor())
+        if token == "(":
+            node = expr()
+            if tokens[pos] != ")":
+                raise ValueError("missing )")
+            pos += 1
+            return node
+        if token is None or token in "&|)":
+            raise ValueError("expected a filter before %s" % (token or "the end"))
+        return ("atom", check_atom(token))
+
+    node = expr()
+    if tokens[pos] is not None:
+        raise ValueError("unexpected %s" % tokens[pos])
+    return node
+
+# an atom in its canonical form (quotes removed)
+def check_atom(token):
+    if token in FILTER_VALUES:
+        return token
+    key, sep, arg = token.partition(":")
+    if arg.startswith('"') and arg.endswith('"') and len(arg) > 1:
+        arg = arg[1:-1]
+    if key == "type" and arg in FILTER_TYPES:
+        return "type:" + arg
+    if key == "tag" and arg in FILTER_TAGS:
+        return "tag:" + arg
+    if key == "file" and arg:
+        return "file:" + arg
+    if key == "name" and arg:
+        try:
+            re.compile(arg)
+        except re.error as e:
+            raise ValueError("bad regex %s: %s" % (arg, e))
+        return "name:" + arg
+    raise ValueError("unknown filter %s" % token)
+
+# bit i set when flags[i]
+def bitset(flags):
+    return int("".join(["1" if flag else "0" for flag in reversed(flags)]) or "0", 2)
+
+# Maps row numbers to symbols for the active filters. Rows are kept sorted in
+# unique_defined_syms order (or the order given to sort(), rows then hold
+# ranks in it), with a snapshot of the values used by the filters so that
+# after a value change only the symbols kconfiglib could have invalidated are
+# looked at again.
+class SymRows:
+    def __init__(self, kconf, filters, tags=None):
+        self.kconf = kconf
+        self.tags = tags
+        self.syms = kconf.unique_defined_syms
+        self.index = {}
+        for i, sym in enumerate(self.syms):
+            self.index[sym] = i
+        self.order = list(range(len(self.syms)))
+        self.rank = list(self.order)
+        self.all = (1 << len(self.syms)) - 1
+        # bitsets of the atoms not depending on values, tags dropped on refilter()
+        self.static = {}
+        self.generation = 0
+        self.filters = list(filters)
+        self.trees = [compile_filter(f) for f in self.filters]
+        self.rebuild()
+
+    # a (str_value, assignable, unset, selected) state as the value atoms,
+    # "shown" is what configable() keeps
+    def flags(self, state):
+        return {
+            "shown": not state[2] or state[1],
+            "=y": state[0] == 'y',
+            "=m": state[0] == 'm',
+            "=n": state[0] == 'n',
+            "set": not state[2],
+            "selected": state[3],
+        }
+
+    def atom(self, key):
+        if key in self.values:
+            return self.values[key]
+        if key == "default":
+            return self.all ^ self.values["set"]
+        if key not in self.static:
+            what, sep, arg = key.partition(":")
+            if what == "type":
+                flags = [sym.orig_type == FILTER_TYPES[arg] for sym in self.syms]
+            elif what == "tag":
+                bit = FILTER_TAGS[arg]
+                flags = [self.tags is not None and self.tags.bits[i] & bit for i in range(len(self.syms))]
+            elif what == "name":
+                pattern = re.compile(arg)
+                flags = [pattern.search(sym.name) for sym in self.syms]
+            else:
+                flags = [any(arg in node.filename for node in sym.nodes) for sym in self.syms]
+            self.static[key] = bitset(flags)
+        return self.static[key]
+
+    def evaluate(self, node):
+        if node[0] == "atom":
+            return self.atom(node[1])
+        if node[0] == "not":
+            return self.all ^ self.evaluate(node[1])
+        if node[0] == "and":
+            return self.evaluate(node[1]) & self.evaluate(node[2])
+        return self.evaluate(node[1]) | self.evaluate(node[2])
+
+    # bitset of the symbols to show
+    def matching(self):
+        result = self.values["shown"]
+        for tree in self.trees:
+            result &= self.evaluate(tree)
+        return result
+
+    def rebuild(self):
+        self.state = []
+        for sym in self.syms:
+            self.state.append((sym.str_value, sym.assignable, sym.user_value is None, expr_value(sym.rev_dep) > 0))
+        self.values = {
+            "shown": bitset([not state[2] or state[1] for state in self.state]),
+            "=y": bitset([state[0] == 'y' for state in self.state]),
+            "=m": bitset([state[0] == 'm' for state in self.state]),
+            "=n": bitset([state[0] == 'n' for state in self.state]),
+            "set": bitset([not state[2] for state in self.state]),
+            "selected": bitset([state[3] for state in self.state]),
+        }
+        self.refilter()
+
+    # new filter expressions (already checked with compile_filter())
+    def set_filters(self, filters):
+        self.filters = list(filters)
+        self.trees = [compile_filter(f) for f in self.filters]
+        self.refilter()
+
+    # after a change of tags
+    def retag(self):
+        if any("tag:" in f for f in self.filters):
+            self.refilter()
+
+    # filters or tags changed, values did not
+    def refilter(self):
+        self.generation += 1
+        for key in list(self.static):
+            if key.startswith("tag:"):
+                del self.static[key]
+        # bit i is character i
+        shown = bin(self.matching())[:1:-1]
+        self.rows = []
+        for r, i in enumerate(self.order):
+            if i < len(shown) and shown[i] == "1":
+                self.rows.append(r)
+
+    # rows ordered by key(sym) (then unique_defined_syms order), None for
+    # the unique_defined_syms order
+    def sort(self, key=None):
+        self.order = list(range(len(self.syms)))
+        if key is not None:
+            self.order.sort(key=lambda i: key(self.syms[i]))
+        for r, i in enumerate(self.order):
+            self.rank[i] = r
+        self.refilter()
+
+    # symbols whose value could have changed after a change of the given ones
+    def dependents(self, syms):
+        seen = set()
+        todo = list(syms)
+        while todo:
+            item = todo.pop()
+            if item in seen:
+                continue
+            seen.add(item)
+            todo.extend(item._dependents)
+            if item.__class__ is kconfiglib.Choice:
+                todo.extend(item.syms)
+            elif item.choice is not None:
+                todo.append(item.choice)
+        return [item for item in seen if item in self.index]
+
+    # update the rows after set_value()/unset_value() on syms, returns the
+    # symbols whose value or assignability changed
+    def update(self, syms):
+        if self.kconf.modules in syms:
+            # kconfiglib invalidates every symbol when MODULES changes, the
+            # type of every tristate changes with it
+            old = self.state
+            self.rebuild()
+            return [sym for i, sym in enumerate(self.syms) if self.state[i] != old[i]]
+        changed = []
+        for sym in self.dependents(syms):
+            i = self.index[sym]
+            state = (sym.str_value, sym.assignable, sym.user_value is None, expr_value(sym.rev_dep) > 0)
+            if state == self.state[i]:
+                continue
+            self.state[i] = state
+            changed.append(sym)
+            for key, flag in self.flags(state).items():
+                if flag:
+                    self.values[key] |= 1 << i
+                else:
+                    self.values[key] &= ~(1 << i)
+        if not changed:
+            return changed
+        shown = self.matching()
+        for sym in changed:
+            i = self.index[sym]
+            r = self.rank[i]
+            row = bisect.bisect_left(self.rows, r)
+            present = row < len(self.rows) and self.rows[row] == r
+            if shown >> i & 1:
+                if not present:
+                    self.rows.insert(row, r)
+            elif present:
+                del self.rows[row]
+        self.generation += 1
+        return changed
+
+    def row_of(self, sym):
+        i = self.index.get(sym)
+        if i is None:
+            return -1
+        r = self.rank[i]
+        row = bisect.bisect_left(self.rows, r)
+        if row < len(self.rows) and self.rows[row] == r:
+            return row
+        return -1
+
+    # sorted rows of the given unique_defined_syms positions, skipping filtered ones
+    def rows_of(self, indices):
+        result = []
+        for i in indices:
+            r = self.rank[i]
+            row = bisect.bisect_left(self.rows, r)
+            if row < len(self.rows) and self.rows[row] == r:
+                result.append(row)
+        result.sort()
+        return result
+
+    # unique_defined_syms position of a row
+    def index_at(self, row):
+        return self.order[self.rows[row]]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, row):
+        return self.syms[self.order[self.rows[row]]]
+
+    def __iter__(self):
+        for r in self.rows:
+            yield self.syms[self.order[r]]
+
+# Symbol search over names (or names, prompts and help texts for full text
+# search). A trigram index is built on first use and gives the candidates
+# which are then checked with the compiled pattern; while typing, a pattern
+# extending the previous one only rechecks the previous matches.
+# Results are sorted positions in unique_defined_syms.
+class SymSearch:
+    def __init__(self, kconf):
+        self.kconf = kconf
+        self.syms = kconf.unique_defined_syms
+        self.texts = {}
+        self.trigrams = {}
+        self.results = {}
+
+    def index(self, full):
+        if full not in self.texts:
+            texts = []
+            for sym in self.syms:
+                if not full:
+                    texts.append(sym.name)
+                    continue
+                text = [sym.name]
+                for node in sym.nodes:
+                    if node.prompt:
+                        text.append(node.prompt[0])
+                    if node.help:
+                        text.append(node.help)
+                texts.append("\n".join(text).lower())
+            trigrams = {}
+            for i, text in enumerate(texts):
+                for tri in set([text[j:j + 3] for j in range(len(text) - 2)]):
+                    if tri in trigrams:
+                        trigrams[tri].append(i)
+                    else:
+                        trigrams[tri] = [i]
+            self.texts[full] = texts
+            self.trigrams[full] = trigrams
+        return self.texts[full], self.trigrams[full]
+
+    def find(self, pattern, full=False):
+        if full:
+            pattern = pattern.lower()
+        key = (full, pattern)
+        if key in self.results:
+            return self.results[key]
+        start = time.perf_counter()
+        texts, trigrams = self.index(full)
+        candidates = None
+        for j in range(len(pattern) - 2):
+            ids = trigrams.get(pattern[j:j + 3], [])
+            if candidates is None or len(ids) < len(candidates):
+                candidates = ids
+        prev = self.results.get((full, pattern[:-1]))
+        if prev is not None and (candidates is None or len(prev) < len(candidates)):
+            candidates = prev
+        if candidates is None:
+            candidates = range(len(texts))
+        regex = re.compile(pattern)
+        matches = [i for i in candidates if regex.search(texts[i])]
+        if len(self.results) > 256:
+            self.results = {}
+        self.results[key] = matches
+        profile_add("search", start)
+        return matches
+
+# Dependency graph of a parsed Kconfig, in compact CSR form over positions in
+# unique_defined_syms: deps[i] are the symbols whose value is used to compute
+# symbol i (direct_dep, rev_dep, weak_rev_dep, defaults and prompt conditions,
+# which carry "if" and menu "visible if"; for a choice member also those of
+# the choice and of the other members), users[i] the reverse edges, i.e. the
+# symbols which may change when symbol i changes.
+class DepGraph:
+    def __init__(self, kconf):
+        self.syms = kconf.unique_defined_syms
+        self.index = {}
+        for i, sym in enumerate(self.syms):
+            self.index[sym] = i
+        edges = []
+        for i, sym in enumerate(self.syms):
+            items = set()
+            for expr in [sym.direct_dep, sym.rev_dep, sym.weak_rev_dep]:
+                items.update(expr_items(expr))
+            for default, cond in sym.defaults:
+                items.update(expr_items(default))
+                items.update(expr_items(cond))
+            for node in sym.nodes:
+                if node.prompt:
+                    items.update(expr_items(node.prompt[1]))
+            if sym.choice:
+                choice = sym.choice
+                items.update(expr_items(choice.direct_dep))
+                for node in choice.nodes:
+                    if node.prompt:
+                        items.update(expr_items(node.prompt[1]))
+                for default, cond in choice.defaults:
+                    items.add(default)
+                    items.update(expr_items(cond))
+                for member in choice.syms:
+                    items.add(member)
+                    items.update(expr_items(member.direct_dep))
+                    for node in member.nodes:
+                        if node.prompt:
+                            items.update(expr_items(node.prompt[1]))
+            edges.append(sorted(self.index[item] for item in items if item in self.index and item is not sym))
+        self.deps_off, self.deps = self.csr(edges)
+        redges = [[] for sym in self.syms]
+        for i, targets in enumerate(edges):
+            for j in targets:
+                redges[j].append(i)
+        self.users_off, self.users = self.csr(redges)
+
+    def csr(self, edges):
+        offsets = array("i", [0])
+        targets = array("i")
+        for e in edges:
+            targets.extend(e)
+            offsets.append(len(targets))
+        return offsets, targets
+
+    def deps_of(self, i):
+        return self.deps[self.deps_off[i]:self.deps_off[i + 1]]
+
+    def users_of(self, i):
+        return self.users[self.users_off[i]:self.users_off[i + 1]]
+
+depgraphs = {}
+
+def get_depgraph(kconf):
+    if id(kconf) not in depgraphs or depgraphs[id(kconf)][0] is not kconf:
+        # forget graphs of Kconfig no longer resident
+        with kconf_lru_lock:
+            resident = list(kconf_lru.values())
+        for key in list(depgraphs):
+            if depgraphs[key][0] not in resident:
+                del depgraphs[key]
+        depgraphs[id(kconf)] = (kconf, DepGraph(kconf))
+    return depgraphs[id(kconf)][1]
+
+# expr_value() with some symbols tristate values overridden
+def what_if_expr(expr, vals):
+    if expr.__class__ is not tuple:
+        if expr in vals:
+            return vals[expr]
+        return expr.tri_value
+    if expr[0] is AND:
+        v1 = what_if_expr(expr[1], vals)
+        return 0 if not v1 else min(v1, what_if_expr(expr[2], vals))
+    if expr[0] is OR:
+        v1 = what_if_expr(expr[1], vals)
+        return 2 if v1 == 2 else max(v1, what_if_expr(expr[2], vals))
+    if expr[0] is NOT:
+        return 2 - what_if_expr(expr[1], vals)
+    if (expr[0] is EQUAL or expr[0] is UNEQUAL) and (expr[1] in vals or expr[2] in vals):
+        v1 = TRI_TO_STR[vals[expr[1]]] if expr[1] in vals else expr[1].str_value
+        v2 = TRI_TO_STR[vals[expr[2]]] if expr[2] in vals else expr[2].str_value
+        return 2 * ((v1 == v2) == (expr[0] is EQUAL))
+    return expr_value(expr)
+
+# Symbol.tri_value of a non choice bool/tristate symbol with overridden values
+# (and user value for the symbol itself when user is not None)
+def what_if_sym(sym, vals, user=None):
+    vis = 0
+    for node in sym.nodes:
+        if node.prompt:
+            vis = max(vis, what_if_expr(node.prompt[1], vals))
+    if vis == 1 and sym.type is not TRISTATE:
+        vis = 2
+    if user is None:
+        user = sym.user_value
+    val = 0
+    if vis and user is not None:
+        val = min(user, vis)
+    else:
+        for default, cond in sym.defaults:
+            dep_val = what_if_expr(cond, vals)
+            if dep_val:
+                val = min(what_if_expr(default, vals), dep_val)
+                break
+        dep_val = what_if_expr(sym.weak_rev_dep, vals)
+        if dep_val and what_if_expr(sym.direct_dep, vals):
+            val = max(dep_val, val)
+    dep_val = what_if_expr(sym.rev_dep, vals)
+    if dep_val:
+        val = max(dep_val, val)
+    if val == 1 and (sym.type is BOOL or what_if_expr(sym.weak_rev_dep, vals) == 2):
+        val = 2
+    return val
+
+# Symbols whose value would change if sym was set to value (0 for disabling),
+# as a list of (sym, old, new), without touching the loaded config.
+# Only the users reachable in the dependency graph are evaluated again. When
+# the change reaches a choice member, or a non bool/tristate symbol used by
+# others, the result comes from impact_real() instead.
+# Returns None for what is not simulated: choice members and non bool/tristate
+# symbols.
+def impact(kconf, sym, value=0):
+    if sym is kconf.modules:
+        return impact_real(kconf, sym, value)
+    graph = get_depgraph(kconf)
+    if sym.orig_type not in (BOOL, TRISTATE) or sym.choice or sym not in graph.index:
+        return None
+    vals = {}
+    new = what_if_sym(sym, vals, value)
+    if new == sym.tri_value:
+        return []
+    vals[sym] = new
+    todo = collections.deque(graph.users_of(graph.index[sym]))
+    # a dependency loop could oscillate, bound the work
+    budget = 20 * len(graph.syms)
+    while todo and budget > 0:
+        budget -= 1
+        i = todo.popleft()
+        user = graph.syms[i]
+        if user is sym:
+            continue
+        if user.choice or (user.orig_type not in (BOOL, TRISTATE) and len(graph.users_of(i))):
+            return impact_real(kconf, sym, value)
+        if user.orig_type not in (BOOL, TRISTATE):
+            continue
+        new = what_if_sym(user, vals)
+        if new == vals.get(user, user.tri_value):
+            continue
+        vals[user] = new
+        todo.extend(graph.users_of(graph.index[user]))
+    changes = []
+    for changed in sorted(vals, key=lambda x: graph.index[x]):
+        if vals[changed] != changed.tri_value:
+            changes.append((changed, changed.tri_value, vals[changed]))
+    return changes
+
+# impact() by setting the value for real and setting the user value back, for
+# what the dependency walk does not simulate: MODULES changes the type of every
+# tristate (m becomes y), choices and non bool/tristate symbols.
+# sym must not be a choice member, unset_value() does not give back the
+# user selection of its choice.
+def impact_real(kconf, sym, value):
+    before = [(other, other.tri_value) for other in kconf.unique_defined_syms if other.orig_type in (BOOL, TRISTATE)]
+    old = sym.user_value
+    sym.set_value(value)
+    changes = [(other, tri, other.tri_value) for other, tri in before if other.tri_value != tri]
+    if old is None:
+        sym.unset_value()
+    else:
+        sym.set_value(old)
+    return changes
+
+def impact_str(changes):
+    if changes is None:
+        return "IF n: not simulated"
+    off = []
+    other = []
+    for sym, old, new in changes:
+        if new == 0:
+            off.append(sym.name)
+        else:
+            other.append("%s:%s->%s" % (sym.name, TRI_TO_STR[old], TRI_TO_STR[new]))
+    st = "IF n: %d off %s" % (len(off), " ".join(off))
+    if other:
+        st += " changed %s" % " ".join(other)
+    return st
+
+# Disable every debug tagged (and not need tagged) config until nothing changes.
+# Each round sets n at once on all candidates which can be set to n, then only
+# the still enabled tagged configs reachable from what changed are tried again.
+# A candidate which would turn off a need tagged config is left alone.
+# Returns (changed syms, {held sym: reason}).
+def minimize(kconf, tags, journal=None):
+    graph = get_depgraph(kconf)
+    need = set(tags.syms[i] for i in tags.indices(TAG_NEED) if tags.syms[i].orig_type in (BOOL, TRISTATE))
+    todo = set()
+    for i in tags.indices(TAG_DEBUG):
+        sym = tags.syms[i]
+        if sym not in need and sym.orig_type in (BOOL, TRISTATE) and sym.tri_value:
+            todo.add(sym)
+    changed = set()
+    held = {}
+    while todo:
+        batch = []
+        for sym in sorted(todo, key=lambda x: graph.index[x]):
+            if not sym.tri_value or 0 not in sym.assignable:
+                continue
+            hurt = [c.name for c, old, new in impact(kconf, sym) or [] if c in need and new < old]
+            if hurt:
+                held[sym] = "NEEDED by %s" % " ".join(hurt)
+                continue
+            batch.append(sym)
+        if not batch:
+            break
+        before = {}
+        for sym in need:
+            before[sym] = sym.tri_value
+        users = {}
+        for sym in batch:
+            users[sym] = sym.user_value
+        set_values(kconf, [sym.name for sym in batch], 0, journal)
+        if any(sym.tri_value < before[sym] for sym in before):
+            # the candidates are fine alone but not together, one by one
+            for sym in batch:
+                set_values(kconf, [sym.name], users[sym], journal)
+            for sym in batch:
+                set_values(kconf, [sym.name], 0, journal)
+                if any(n.tri_value < before[n] for n in before):
+                    set_values(kconf, [sym.name], users[sym], journal)
+                    held[sym] = "NEEDED together with other debug configs"
+            batch = [sym for sym in batch if sym not in held]
+        changed.update(batch)
+        # next candidates: still enabled tagged configs depending on this batch
+        reach = set()
+        stack = [graph.index[sym] for sym in batch]
+        while stack:
+            i = stack.pop()
+            for j in graph.users_of(i):
+                if j not in reach:
+                    reach.add(j)
+                    stack.append(j)
+        todo = set(sym for sym in todo if sym.tri_value and graph.index[sym] in reach and sym not in held)
+    for i in tags.indices(TAG_DEBUG):
+        sym = tags.syms[i]
+        if sym in need or sym in held or sym.orig_type not in (BOOL, TRISTATE) or not sym.tri_value:
+            continue
+        selectors = active_terms(sym.rev_dep)
+        if selectors:
+            held[sym] = "SELECTED by %s" % selectors
+        elif not sym.visibility:
+            held[sym] = "NOT VISIBLE, default %s" % sym.str_value
+        else:
+            held[sym] = "HELD at %s" % sym.str_value
+    return changed, held
+
+# draw only the rows in the viewport, returns the name of the symbol under the cursor
+def draw_symbols(pad, ipad, symrows, tags, marked, offset, height, cursor, impacts, sizes=None):
+    cur = ""
+    pad.erase()
+    for y in range(0, height):
+        if offset + y >= len(symrows):
+            break
+        sym = symrows[offset + y]
+        x = 2
+        buf = "  "
+        if sym.user_value is None:
+            x = 4
+        if sym.name in marked:
+            buf = " +"
+        if cursor == offset + y:
+            buf = "x" + buf[1]
+            cur = sym.name
+            ipad.erase()
+            for line, text in info_lines(sym):
+                ipad.addstr(line, 0, text)
+            if sym in impacts:
+                ipad.addstr(7, 0, impacts[sym])
+        bits = tags.bits[symrows.index_at(offset + y)]
+        color = L_WHITE
+        if bits & TAG_DEBUG:
+            color = L_YELLOW
+        if bits & TAG_HARDEN:
+            color = L_GREEN
+        if bits & TAG_NEED:
+            color = L_RED
+        cole = 0
+        if sym.str_value == 'y':
+            cole = curses.A_BOLD
+        pad.addstr(y, 0, buf)
+        pad.addstr(y, x, "%s %s  " % (sym.name, sym.str_value), curses.color_pair(color) + cole)
+        if sizes and sym.name in sizes:
+            # files and KiB of sources built by the symbol
+            pad.addstr("%df %dK" % (sizes[sym.name][0], sizes[sym.name][1] // 1024), curses.color_pair(L_CYAN))
+    return cur
+
+def list_arches():
+    os.chdir(sourcedir)
+    dirs = os.listdir("arch")
+    archlist = []
+    for fdir in dirs:
+        if fdir in [ ".gitignore", "Kconfig" ]:
+            continue
+        archlist.append(fdir)
+    return archlist
+
+def list_defconfigs(srcarch):
+    defconfig_list = []
+    os.chdir(sourcedir)
+    dirs = os.listdir("arch/%s/configs/" % srcarch)
+    for fdir in dirs:
+        if fdir in [ ".gitignore" ]:
+            continue
+        defconfig_list.append(fdir)
+    return defconfig_list
+
+# The config as text, in one pass over unique_defined_syms: only the symbols
+# with a user value (what a defconfig holds) unless full, and without the
+# symbols having no value if skip_empty. An empty int/hex is never written,
+# "CONFIG_X=" is dropped by the next load_config().
+def config_text(kconf, full=False, skip_empty=False):
+    lines = []
+    for sym in kconf.unique_defined_syms:
+        if sym.user_value is None and not full:
+            continue
+        value = sym.str_value
+        if value == "" and (skip_empty or sym.type in (INT, HEX)):
+            continue
+        if value == 'n':
+            lines.append("# CONFIG_%s is not set\n" % sym.name)
+        elif sym.type == STRING:
+            lines.append('CONFIG_%s="%s"\n' % (sym.name, kconfiglib.escape(value)))
+        else:
+            lines.append("CONFIG_%s=%s\n" % (sym.name, value))
+    return "".join(lines)
+
+def reduced_config(kconf):
+    return config_text(kconf)
+
+# Replace path by text (via a temp file and an atomic rename) only when the
+# content differs, returns True if the file was written
+def write_if_changed(path, text):
+    try:
+        with open(path) as rfile:
+            if rfile.read() == text:
+                return False
+    except OSError:
+        pass
+    write_atomic(path, lambda rfile: rfile.write(text))
+    return True
+
+# tagged symbols of a loaded defconfig and the debug ones still enabled
+def tag_report(kconf, defconfig):
+    tags = SymTags(kconf, defconfig)
+    tagged = {}
+    debug_on = []
+    for i in tags.indices(TAG_DEBUG | TAG_HARDEN | TAG_NEED):
+        sym = kconf.unique_defined_syms[i]
+        names = []
+        for typ, bit in TAG_TYPES:
+            if tags.bits[i] & bit:
+                names.append(typ)
+        tagged[sym.name] = {"tags": names, "value": sym.str_value}
+        if tags.bits[i] & TAG_DEBUG and sym.str_value not in ('n', ''):
+            debug_on.append(sym.name)
+    return tagged, debug_on
+
+# worker processes not forked from the main one (spawn, forkserver) start
+# without the setup
+def init_worker(wargs, wconfigdir):
+    global args
+    if sourcedir is None:
+        args = wargs
+        os.chdir(wconfigdir)
+        setup()
+
+# runs in a --batch worker process, each worker keeps its parsed arches in kconf_lru
+def batch_worker(srcarch, defconfigs, outdir):
+    results = []
+    for defconfig in defconfigs:
+        result = {"arch": srcarch, "defconfig": defconfig}
+        try:
+            kconf = load_defconfig(srcarch, defconfig)
+            os.makedirs("%s/%s" % (outdir, srcarch), exist_ok=True)
+            write_if_changed("%s/%s/%s" % (outdir, srcarch, defconfig), reduced_config(kconf))
+            result["tagged"], result["debug_on"] = tag_report(kconf, defconfig)
+        except (OSError, kconfiglib.KconfigError, SystemExit) as e:
+            result["error"] = str(e)
+        results.append(result)
+    return results
+
+# split the defconfig list of each arch (a dict arch -> list) in up to jobs
+# chunks, interleaved by arch so that the workers first parse (and cache)
+# different arches
+def split_chunks(lists, jobs):
+    chunks = {}
+    for srcarch, present in lists.items():
+        size = max((len(present) + jobs - 1) // jobs, 1)
+        chunks[srcarch] = [present[i:i + size] for i in range(0, len(present), size)]
+    tasks = []
+    while chunks:
+        for srcarch in list(chunks):
+            tasks.append((srcarch, chunks[srcarch].pop(0)))
+            if not chunks[srcarch]:
+                del chunks[srcarch]
+    return tasks
+
+# the defconfigs (all if None) of each arch, split by split_chunks()
+def defconfig_chunks(arches, defconfigs, jobs):
+    lists = {}
+    for srcarch in arches:
+        if not os.path.isdir("%s/arch/%s/configs" % (sourcedir, srcarch)):
+            continue
+        present = sorted(list_defconfigs(srcarch))
+        if defconfigs is not None:
+            present = [defconfig for defconfig in present if defconfig in defconfigs]
+        if present:
+            lists[srcarch] = present
+    return split_chunks(lists, jobs)
+
+# runs in a --overwrite worker process: the tag policy (minimize()) applied
+# to each defconfig, rewritten only when it changes
+def overwrite_worker(srcarch, defconfigs):
+    results = []
+    for defconfig in defconfigs:
+        result = {"arch": srcarch, "defconfig": defconfig}
+        try:
+            kconf = load_defconfig(srcarch, defconfig)
+            changed, held = minimize(kconf, SymTags(kconf, defconfig))
+            result["disabled"] = len(changed)
+            result["written"] = write_if_changed("arch/%s/configs/%s" % (srcarch, defconfig), config_text(kconf))
+        except (OSError, kconfiglib.KconfigError, SystemExit) as e:
+            result["error"] = str(e)
+        results.append(result)
+    return results
+
+def overwrite():
+    if args.arch:
+        arches = args.arch.split(",")
+    else:
+        arches = list_arches()
+    defconfigs = None
+    if args.defconfig:
+        defconfigs = args.defconfig.split(",")
+    jobs = max(args.jobs or 1, 1)
+    tasks = defconfig_chunks(arches, defconfigs, jobs)
+    written = 0
+    import concurrent.futures
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(args, configdir)) as executor:
+        futures = [executor.submit(overwrite_worker, srcarch, chunk) for srcarch, chunk in tasks]
+        for future in concurrent.futures.as_completed(futures):
+            for result in future.result():
+                if "error" in result:
+                    print("%s/%s: ERROR %s" % (result["arch"], result["defconfig"], result["error"]))
+                elif result["written"]:
+                    written += 1
+                    print("%s/%s: %d debug configs disabled, rewritten" % (result["arch"], result["defconfig"], result["disabled"]))
+    print("%d defconfigs rewritten" % written)
+
+def batch():
+    if args.arch:
+        arches = args.arch.split(",")
+    else:
+        arches = list_arches()
+    jobs = max(args.jobs or 1, 1)
+    outdir = "%s/batch" % configdir
+    tasks = defconfig_chunks(arches, None, jobs)
+    results = []
+    import concurrent.futures
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(args, configdir)) as executor:
+        futures = [executor.submit(batch_worker, srcarch, defconfigs, outdir) for srcarch, defconfigs in tasks]
+        for future in concurrent.futures.as_completed(futures):
+            for result in future.result():
+                if "error" in result:
+                    print("%s/%s: ERROR %s" % (result["arch"], result["defconfig"], result["error"]))
+                else:
+                    print("%s/%s: %d tagged, %d debug still enabled" % (result["arch"], result["defconfig"], len(result["tagged"]), len(result["debug_on"])))
+                results.append(result)
+    results.sort(key=lambda r: (r["arch"], r["defconfig"]))
+    os.makedirs(outdir, exist_ok=True)
+    with open("%s/report.json" % outdir, 'w') as rfile:
+        json.dump(results, rfile, indent=1, sort_keys=True)
+    print("Results in %s" % outdir)
+
+# why a bool/tristate symbol cannot be enabled: its unmet dependencies, or
+# the missing prompt (only a select or a default can enable it)
+def blockers(sym):
+    terms = [term for term in kconfiglib.split_expr(sym.direct_dep, AND) if not expr_value(term)]
+    if terms:
+        return "DEPEND ON %s" % " && ".join(expr_str(term, sc_expr_str_fn=my_sc_expr_str) for term in terms)
+    prompts = [node.prompt for node in sym.nodes if node.prompt]
+    if not prompts:
+        return "NO PROMPT"
+    for prompt in prompts:
+        terms = [term for term in kconfiglib.split_expr(prompt[1], AND) if not expr_value(term)]
+        if terms:
+            return "VISIBLE IF %s" % " && ".join(expr_str(term, sc_expr_str_fn=my_sc_expr_str) for term in terms)
+    return ""
+
+# --harden: one row per harden tagged symbol of a defconfig with its status,
+# enabled, can enable (a prompt with met dependencies), blocked (and by
+# what) or absent (not in the Kconfig of the arch)
+def harden_names(defconfig):
+    return sorted(name for name in configs.get("configs", {}) if config_get(name, defconfig, "harden"))
+
+def harden_rows(kconf, srcarch, defconfig):
+    rows = []
+    for name in harden_names(defconfig):
+        row = {"arch": srcarch, "defconfig": defconfig, "symbol": name, "value": "", "status": "absent", "blocked_by": ""}
+        sym = kconf.syms.get(name)
+        if sym is not None and sym.nodes:
+            row["value"] = sym.str_value
+            if sym.str_value not in ('n', ''):
+                row["status"] = "enabled"
+            elif sym.orig_type in (BOOL, TRISTATE) and sym.assignable and max(sym.assignable) > sym.tri_value:
+                row["status"] = "can enable"
+            else:
+                row["status"] = "blocked"
+                row["blocked_by"] = blockers(sym)
+        rows.append(row)
+    return rows
+
+def harden_worker(srcarch, defconfigs):
+    results = []
+    for defconfig in defconfigs:
+        try:
+            kconf = load_defconfig(srcarch, defconfig)
+            tree = json.dumps(kconf_stamp(kconf_paths(kconf), kconf.env_vars), sort_keys=True)
+            results.append((defconfig, tree, harden_rows(kconf, srcarch, defconfig), None))
+        except (Exception, SystemExit) as e:
+            # reported on its own line, the other defconfigs go on
+            results.append((defconfig, None, None, "%s: %s" % (e.__class__.__name__, e)))
+    return results
+
+# stamp of the Kconfig tree of srcarch as its parse cache has it, None
+# without a valid cache
+def kconf_cache_stamp(srcarch):
+    import pickle
+    os.environ["ARCH"] = srcarch
+    os.environ["SRCARCH"] = srcarch
+    try:
+        with open(kconf_cache_path(), 'rb') as cfile:
+            header = kconf_cache_header(cfile)
+    except (OSError, EOFError, pickle.UnpicklingError, KeyError):
+        return None
+    if header is None:
+        return None
+    return json.dumps(header["stamp"], sort_keys=True)
+
+# The rows of each defconfig are cached with the Kconfig tree stamp and a hash
+# of the defconfig content and of its harden tag set, only the defconfigs
+# where one changed are loaded again, by the worker processes.
+def harden():
+    if args.arch:
+        arches = args.arch.split(",")
+    else:
+        arches = list_arches()
+    defconfigs = None
+    if args.defconfig:
+        defconfigs = args.defconfig.split(",")
+    path = os.path.join(cachedir, "harden-%s.json" % hashlib.sha1(sourcedir.encode("UTF8")).hexdigest())
+    cached = {}
+    try:
+        with open(path) as cfile:
+            cached = json.load(cfile)
+    except (OSError, ValueError):
+        pass
+    entries = {}
+    todo = {}
+    for srcarch, chunk in defconfig_chunks(arches, defconfigs, 1):
+        tree = kconf_cache_stamp(srcarch)
+        for defconfig in chunk:
+            try:
+                with open("%s/arch/%s/configs/%s" % (sourcedir, srcarch, defconfig), 'rb') as dfile:
+                    content = dfile.read()
+            except OSError as e:
+                print("ERROR: %s/%s: %s" % (srcarch, defconfig, e), file=sys.stderr)
+                continue
+            key = hashlib.sha1(content + json.dumps(harden_names(defconfig)).encode("UTF8")).hexdigest()
+            name = "%s/%s" % (srcarch, defconfig)
+            entry = cached.get(name)
+            if tree is not None and entry is not None and entry["tree"] == tree and entry["key"] == key:
+                entries[name] = entry
+            else:
+                entries[name] = {"key": key}
+                todo.setdefault(srcarch, []).append(defconfig)
+    recomputed = 0
+    if todo:
+        jobs = max(args.jobs or 1, 1)
+        tasks = split_chunks(todo, jobs)
+        import concurrent.futures
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(args, configdir)) as executor:
+            futures = [(srcarch, executor.submit(harden_worker, srcarch, chunk)) for srcarch, chunk in tasks]
+            for srcarch, future in futures:
+                for defconfig, tree, rows, error in future.result():
+                    name = "%s/%s" % (srcarch, defconfig)
+                    if error is not None:
+                        print("ERROR: %s: %s" % (name, error), file=sys.stderr)
+                        del entries[name]
+                        continue
+                    entries[name]["tree"] = tree
+                    entries[name]["rows"] = rows
+                    recomputed += 1
+    try:
+        os.makedirs(cachedir, exist_ok=True)
+        write_atomic(path, lambda cfile: json.dump(dict(cached, **entries), cfile))
+    except OSError as e:
+        if args.debug:
+            print("WARNING: cannot write harden cache %s: %s" % (path, e), file=sys.stderr)
+    rows = []
+    for name in sorted(entries):
+        rows += entries[name]["rows"]
+    if args.format == "json":
+        json.dump(rows, sys.stdout, indent=1)
+        print()
+    else:
+        import csv
+        writer = csv.DictWriter(sys.stdout, fieldnames=["arch", "defconfig", "symbol", "value", "status", "blocked_by"])
+        writer.writeheader()
+        writer.writerows(rows)
+    print("%d defconfigs, %d recomputed" % (len(entries), recomputed), file=sys.stderr)
+
+# --compare: revision of the source tree, the git HEAD of a clean work tree
+# (tracked files) or else a hash of the Kconfig files
+def source_revision(srcdir):
+    import subprocess
+    try:
+        head = subprocess.run(["git", "rev-parse", "HEAD"], cwd=srcdir, capture_output=True, text=True)
+        if head.returncode == 0:
+            status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=srcdir, capture_output=True, text=True)
+            if status.returncode == 0 and not status.stdout.strip():
+                return "git:%s" % head.stdout.strip()
+    except OSError:
+        pass
+    digest = hashlib.sha1()
+    for dirpath, dirnames, filenames in os.walk(srcdir):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+        for name in sorted(filenames):
+            if name.startswith("Kconfig"):
+                path = os.path.join(dirpath, name)
+                digest.update(os.path.relpath(path, srcdir).encode("UTF8") + b"\0")
+                with open(path, 'rb') as kfile:
+                    digest.update(kfile.read())
+    return "hash:%s" % digest.hexdigest()
+
+# {name: [type, defaults, value]} of a defconfig, defaults as written in Kconfig
+def compare_data(kconf):
+    data = {}
+    for sym in kconf.unique_defined_syms:
+        defaults = " / ".join(expr_str(value) if cond is kconf.y else "%s if %s" % (expr_str(value), expr_str(cond)) for value, cond in sym.defaults)
+        data[sym.name] = [kconfiglib.TYPE_TO_STR[sym.orig_type], defaults, sym.str_value]
+    return data
+
+# runs in a --compare worker process, one per source
+def compare_worker(source, srcarch, defconfig):
+    enter_source(source)
+    return compare_data(load_defconfig(srcarch, defconfig))
+
+# The data of each side is cached by (source revision, arch, defconfig
+# content), the sides missing from the cache are loaded by two worker
+# processes at once.
+def compare():
+    if not args.arch or not args.defconfig:
+        print("ERROR: --compare need --arch and --defconfig")
+        sys.exit(1)
+    sides = []
+    for source in args.compare:
+        if "path" not in configs["base"]["sources"].get(source, {}):
+            print("ERROR: did not find path in base/sources/%s in %s/configs.yaml" % (source, configdir))
+            sys.exit(1)
+        srcdir = configs["base"]["sources"][source]["path"]
+        try:
+            with open("%s/arch/%s/configs/%s" % (srcdir, args.arch, args.defconfig), 'rb') as dfile:
+                content = dfile.read()
+        except OSError as e:
+            print("ERROR: %s: %s" % (source, e))
+            sys.exit(1)
+        key = "%d:%s:%s:%s:%s" % (KCONF_CACHE_VERSION, source_revision(srcdir), args.arch, args.defconfig, hashlib.sha1(content).hexdigest())
+        path = os.path.join(cachedir, "compare-%s.json" % hashlib.sha1(key.encode("UTF8")).hexdigest())
+        data = None
+        try:
+            with open(path) as cfile:
+                data = json.load(cfile)
+        except (OSError, ValueError):
+            pass
+        sides.append([source, path, data])
+    todo = [side for side in sides if side[2] is None]
+    if todo:
+        import concurrent.futures
+        with concurrent.futures.ProcessPoolExecutor(max_workers=len(todo), initializer=init_worker, initargs=(args, configdir)) as executor:
+            futures = [executor.submit(compare_worker, side[0], args.arch, args.defconfig) for side in todo]
+            for side, future in zip(todo, futures):
+                try:
+                    side[2] = future.result()
+                except (OSError, kconfiglib.KconfigError, SystemExit) as e:
+                    print("ERROR: %s: %s" % (side[0], e))
+                    sys.exit(1)
+                try:
+                    os.makedirs(cachedir, exist_ok=True)
+                    write_atomic(side[1], lambda cfile: json.dump(side[2], cfile))
+                except OSError as e:
+                    if args.debug:
+                        print("WARNING: cannot write compare cache %s: %s" % (side[1], e), file=sys.stderr)
+    a = sides[0][2]
+    b = sides[1][2]
+    rows = []
+    for name in sorted(set(a) | set(b)):
+        if name not in a:
+            rows.append({"change": "added", "symbol": name, "a": "", "b": b[name][2]})
+        elif name not in b:
+            rows.append({"change": "removed", "symbol": name, "a": a[name][2], "b": ""})
+        else:
+            if a[name][0] != b[name][0]:
+                rows.append({"change": "type", "symbol": name, "a": a[name][0], "b": b[name][0]})
+            if a[name][1] != b[name][1]:
+                rows.append({"change": "default", "symbol": name, "a": a[name][1], "b": b[name][1]})
+            if a[name][2] != b[name][2]:
+                rows.append({"change": "value", "symbol": name, "a": a[name][2], "b": b[name][2]})
+    if args.format == "json":
+        json.dump(rows, sys.stdout, indent=1)
+        print()
+    else:
+        import csv
+        writer = csv.DictWriter(sys.stdout, fieldnames=["change", "symbol", "a", "b"])
+        writer.writeheader()
+        writer.writerows(rows)
+    counts = collections.Counter(row["change"] for row in rows)
+    print("%s -> %s: %d added, %d removed, %d types, %d defaults and %d values changed, %d sides loaded" % (args.compare[0], args.compare[1], counts["added"], counts["removed"], counts["type"], counts["default"], counts["value"], len(todo)), file=sys.stderr)
+
+# --serve: one JSON request (or a JSON array of requests, answered by an array)
+# per line on a Unix socket, one JSON answer per line. A request is
+# {"op": OP, "arch": ARCH, "defconfig": DEFCONFIG, ...} with OP in:
+# ping, value ("symbols": [names]), reduced, tags, impact ("symbol": name)
+# and tag ("symbol", "type", "value", "defconfig" optional).
+# Requests are served one at a time, the Kconfig of each arch stays in
+# kconf_lru and the loaded defconfig is only reloaded when it changes. The
+# Kconfig is parsed again when one of its files changed, checked once per
+# batch.
+serve_lock = threading.Lock()
+# (sourcedir, srcarch) -> (defconfig, mtime) loaded in the resident Kconfig
+serve_loaded = {}
+# (sourcedir, srcarch) -> (Kconfig, stamp of its files when it was parsed)
+serve_trees = {}
+# arches whose Kconfig files were checked during the current batch
+serve_checked = set()
+
+def serve_defconfig(srcarch, defconfig):
+    if srcarch not in list_arches() or defconfig not in list_defconfigs(srcarch):
+        raise ValueError("unknown defconfig %s/%s" % (srcarch, defconfig))
+    key = (sourcedir, srcarch)
+    stamp = (defconfig, os.stat("arch/%s/configs/%s" % (srcarch, defconfig)).st_mtime_ns)
+    with kconf_lru_lock:
+        kconf = kconf_lru.get(key)
+    if kconf is not None and key not in serve_checked:
+        serve_checked.add(key)
+        tree = serve_trees.get(key)
+        if tree is not None and tree[0] is kconf and kconf_stamp(kconf_paths(kconf), [])["files"] != tree[1]:
+            # the source tree changed under the daemon (pull, rebase...)
+            with kconf_lru_lock:
+                kconf_lru.pop(key, None)
+            kconf = None
+    if kconf is not None and serve_loaded.get(key) == stamp:
+        return kconf
+    kconf = load_defconfig(srcarch, defconfig)
+    serve_loaded[key] = stamp
+    if key not in serve_trees or serve_trees[key][0] is not kconf:
+        with kconf_lru_lock:
+            resident = list(kconf_lru.values())
+        for other in list(serve_trees):
+            if serve_trees[other][0] not in resident:
+                del serve_trees[other]
+        serve_trees[key] = (kconf, kconf_stamp(kconf_paths(kconf), [])["files"])
+    return kconf
+
+def serve_one(req):
+    op = req.get("op")
+    if op == "ping":
+        return {"version": os.environ.get("KERNELVERSION"), "source": sourcedir}
+    if op not in ["value", "reduced", "tags", "impact", "tag"]:
+        raise ValueError("unknown op %s" % op)
+    if op == "tag":
+        config_set(req["symbol"], req["type"], req.get("defconfig"), req.get("value", True))
+        return {}
+    kconf = serve_defconfig(req["arch"], req["defconfig"])
+    if op == "value":
+        values = {}
+        for name in req["symbols"]:
+            if name.startswith("CONFIG_"):
+                name = name[7:]
+            sym = kconf.syms.get(name)
+            values[name] = sym.str_value if sym is not None and sym.nodes else None
+        return {"values": values}
+    if op == "reduced":
+        return {"config": reduced_config(kconf)}
+    if op == "tags":
+        tagged, debug_on = tag_report(kconf, req["defconfig"])
+        return {"tagged": tagged, "debug_on": debug_on}
+    if op == "impact":
+        sym = kconf.syms.get(req["symbol"])
+        if sym is None:
+            raise ValueError("unknown symbol %s" % req["symbol"])
+        changes = impact(kconf, sym)
+        if changes is None:
+            raise ValueError("impact of %s is not simulated" % sym.name)
+        return {"impact": [[c.name, TRI_TO_STR[old], TRI_TO_STR[new]] for c, old, new in changes]}
+
+# answers in request order, but requests of the same defconfig are served together
+def serve_batch(reqs):
+    answers = [None] * len(reqs)
+    valid = []
+    for i, req in enumerate(reqs):
+        if isinstance(req, dict):
+            valid.append(i)
+        else:
+            answers[i] = {"error": "request is not an object"}
+    order = sorted(valid, key=lambda i: (str(reqs[i].get("arch")), str(reqs[i].get("defconfig"))))
+    with serve_lock:
+        serve_checked.clear()
+        for i in order:
+            try:
+                answers[i] = serve_one(reqs[i])
+            except KeyError as e:
+                answers[i] = {"error": "missing %s" % e}
+            except (OSError, ValueError, kconfiglib.KconfigError, SystemExit) as e:
+                answers[i] = {"error": str(e)}
+            except Exception as e:
+                # a field of the wrong type, the other requests still get their answer
+                answers[i] = {"error": "%s: %s" % (e.__class__.__name__, e)}
+    return answers
+
+def socket_path():
+    if args.socket:
+        return args.socket
+    return "%s/kconfigizer.sock" % configdir
+
+def serve():
+    import socket
+    import socketserver
+
+    class ServeHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                try:
+                    req = json.loads(line)
+                except ValueError as e:
+                    answer = {"error": "bad request: %s" % e}
+                else:
+                    if isinstance(req, list):
+                        answer = serve_batch(req)
+                    else:
+                        answer = serve_batch([req])[0]
+                self.wfile.write(json.dumps(answer).encode("UTF8") + b"\n")
+                self.wfile.flush()
+
+    class ServeServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    path = socket_path()
+    if os.path.exists(path):
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.connect(path)
+            print("ERROR: a server already listens on %s" % path)
+            sys.exit(1)
+        except OSError:
+            os.unlink(path)
+    if args.arch:
+        # warm up
+        for srcarch in args.arch.split(","):
+            get_kconf(srcarch)
+    server = ServeServer(path, ServeHandler)
+    print("Serving %s on %s" % (sourcedir, path))
+    # exit (and remove the socket) on kill too
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(path)
+
+# one batch of the JSON requests read on stdin, answers on stdout
+def client():
+    import socket
+    reqs = []
+    for n, line in enumerate(sys.stdin, 1):
+        if line.strip():
+            try:
+                reqs.append(json.loads(line))
+            except ValueError as e:
+                print("ERROR: bad request on line %d: %s" % (n, e))
+                sys.exit(1)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path())
+        except OSError as e:
+            print("ERROR: cannot connect to %s: %s" % (socket_path(), e))
+            sys.exit(1)
+        sock.sendall(json.dumps(reqs).encode("UTF8") + b"\n")
+        rfile = sock.makefile("rb")
+        reply = rfile.readline()
+    try:
+        answers = json.loads(reply)
+    except ValueError:
+        answers = None
+    if not isinstance(answers, list):
+        if reply:
+            print("ERROR: bad answer from %s: %s" % (socket_path(), reply.decode("UTF8", "replace").strip()))
+        else:
+            print("ERROR: connection to %s closed without an answer" % socket_path())
+        sys.exit(1)
+    failed = False
+    for answer in answers:
+        print(json.dumps(answer))
+        if "error" in answer:
+            failed = True
+    if failed:
+        sys.exit(1)
+
+# Values of every symbol in every defconfig of an arch, stored column-wise:
+# one array of uint16 codes per defconfig (MATRIX_CODES for bool/tristate and
+# empty values, MATRIX_STR + n for entry n of the string table).
+# The file is a small JSON header followed by the raw columns and is mmap'ed
+# when loaded; on update only columns of changed defconfigs are recomputed.
+MATRIX_MAGIC = b"KMX1"
+MATRIX_CODES = ["n", "m", "y", ""]
+MATRIX_STR = len(MATRIX_CODES)
+
+class ValueMatrix:
+    def __init__(self, srcarch):
+        self.srcarch = srcarch
+        key = "%s:%s" % (sourcedir, srcarch)
+        self.path = os.path.join(cachedir, "matrix-%s.kmx" % hashlib.sha1(key.encode("UTF8")).hexdigest())
+        self.tree = None
+        self.symbols = []
+        self.strings = []
+        self.columns = collections.OrderedDict()
+        self.stamps = {}
+        self.mm = None
+
+    def load(self):
+        try:
+            with open(self.path, 'rb') as mfile:
+                if mfile.read(4) != MATRIX_MAGIC:
+                    return False
+                hlen = int.from_bytes(mfile.read(4), "little")
+                header = json.loads(mfile.read(hlen).decode("UTF8"))
+                self.mm = mmap.mmap(mfile.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+        if header.get("byteorder") != sys.byteorder:
+            return False
+        self.tree = header["tree"]
+        self.symbols = header["symbols"]
+        self.strings = header["strings"]
+        size = len(self.symbols) * 2
+        # columns follow the header, aligned on 8 bytes
+        offset = (8 + hlen + 7) & ~7
+        view = memoryview(self.mm)
+        for defconfig, stamp in header["columns"]:
+            self.columns[defconfig] = view[offset:offset + size].cast("H")
+            self.stamps[defconfig] = stamp
+            offset += size
+        return True
+
+    def save(self):
+        header = {
+            "byteorder": sys.byteorder,
+            "tree": self.tree,
+            "symbols": self.symbols,
+            "strings": self.strings,
+            "columns": [[defconfig, self.stamps[defconfig]] for defconfig in self.columns],
+        }
+        hdata = json.dumps(header).encode("UTF8")
+        os.makedirs(cachedir, exist_ok=True)
+
+        def write(mfile):
+            mfile.write(MATRIX_MAGIC)
+            mfile.write(len(hdata).to_bytes(4, "little"))
+            mfile.write(hdata)
+            mfile.write(b"\0" * (((8 + len(hdata) + 7) & ~7) - 8 - len(hdata)))
+            for defconfig in self.columns:
+                mfile.write(self.columns[defconfig].tobytes())
+        write_atomic(self.path, write, 'wb')
+
+    def code(self, value, strings):
+        if value in MATRIX_CODES:
+            return MATRIX_CODES.index(value)
+        if value not in strings:
+            strings[value] = len(self.strings)
+            self.strings.append(value)
+        return MATRIX_STR + strings[value]
+
+    def value(self, code):
+        if code < MATRIX_STR:
+            return MATRIX_CODES[code]
+        return self.strings[code - MATRIX_STR]
+
+    def update(self):
+        kconf = get_kconf(self.srcarch)
+        tree = json.dumps(kconf_stamp(kconf_paths(kconf), kconf.env_vars), sort_keys=True)
+        symbols = [sym.name for sym in kconf.unique_defined_syms]
+        if tree != self.tree or symbols != self.symbols:
+            # Kconfig changed, every column is stale
+            self.tree = tree
+            self.symbols = symbols
+            self.strings = []
+            self.columns = collections.OrderedDict()
+            self.stamps = {}
+        defconfigs = sorted(list_defconfigs(self.srcarch))
+        todo = []
+        for defconfig in defconfigs:
+            st = os.stat("%s/arch/%s/configs/%s" % (sourcedir, self.srcarch, defconfig))
+            stamp = [st.st_mtime_ns, st.st_size]
+            if self.stamps.get(defconfig) != stamp:
+                todo.append(defconfig)
+                self.stamps[defconfig] = stamp
+        strings = {}
+        for i, value in enumerate(self.strings):
+            strings[value] = i
+        columns = collections.OrderedDict()
+        for defconfig in defconfigs:
+            if defconfig not in todo:
+                columns[defconfig] = array("H", self.columns[defconfig])
+        if todo:
+            jobs = max(min(args.jobs or 1, len(todo)), 1)
+            size = (len(todo) + jobs - 1) // jobs
+            import concurrent.futures
+            with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(args, configdir)) as executor:
+                futures = [executor.submit(matrix_worker, self.srcarch, todo[i:i + size]) for i in range(0, len(todo), size)]
+                for future in futures:
+                    for defconfig, names, values in future.result():
+                        if names != symbols:
+                            print("ERROR: %s parsed differently in worker" % defconfig)
+                            sys.exit(1)
+                        columns[defconfig] = array("H", [self.code(v, strings) for v in values])
+        for defconfig in defconfigs:
+            self.columns[defconfig] = columns[defconfig]
+        for defconfig in list(self.columns):
+            if defconfig not in columns:
+                del self.columns[defconfig]
+                del self.stamps[defconfig]
+        self.mm = None
+        if todo or len(self.columns) != len(defconfigs):
+            self.save()
+        return todo
+
+    def enables(self, name):
+        i = self.symbols.index(name)
+        return [defconfig for defconfig, col in self.columns.items() if col[i] in (1, 2)]
+
+    def diff(self, a, b):
+        cola = self.columns[a]
+        colb = self.columns[b]
+        result = []
+        for i, (va, vb) in enumerate(zip(cola, colb)):
+            if va != vb:
+                result.append((self.symbols[i], self.value(va), self.value(vb)))
+        return result
+
+    # debug tagged symbols enabled in at least one defconfig, with those defconfigs
+    def debug_on(self):
+        index = {}
+        for i, name in enumerate(self.symbols):
+            index[name] = i
+        result = {}
+        for name in configs.get("configs", {}):
+            if name not in index:
+                continue
+            i = index[name]
+            for defconfig, col in self.columns.items():
+                if col[i] in (1, 2) and config_get(name, defconfig, "debug"):
+                    result.setdefault(name, []).append(defconfig)
+        return result
+
+def matrix_worker(srcarch, defconfigs):
+    results = []
+    for defconfig in defconfigs:
+        kconf = load_defconfig(srcarch, defconfig)
+        names = [sym.name for sym in kconf.unique_defined_syms]
+        values = [sym.str_value for sym in kconf.unique_defined_syms]
+        results.append((defconfig, names, values))
+    return results
+
+def matrix():
+    if not args.arch:
+        print("ERROR: --matrix need --arch")
+        sys.exit(1)
+    vm = ValueMatrix(args.arch)
+    vm.load()
+    todo = vm.update()
+    print("Matrix %s: %d symbols x %d defconfigs, %d recomputed" % (vm.path, len(vm.symbols), len(vm.columns), len(todo)))
+    if args.matrix_enables:
+        if args.matrix_enables not in vm.symbols:
+            print("ERROR: unknown symbol %s" % args.matrix_enables)
+            sys.exit(1)
+        for defconfig in vm.enables(args.matrix_enables):
+            print(defconfig)
+    if args.matrix_diff:
+        for defconfig in args.matrix_diff:
+            if defconfig not in vm.columns:
+                print("ERROR: unknown defconfig %s" % defconfig)
+                sys.exit(1)
+        for name, va, vb in vm.diff(args.matrix_diff[0], args.matrix_diff[1]):
+            print("%s %s %s" % (name, va, vb))
+    if args.matrix_debug:
+        for name, defconfigs in sorted(vm.debug_on().items()):
+            print("%s: %s" % (name, " ".join(defconfigs)))
+
+# Symbol to built sources index: every Kbuild/Makefile of the tree is read for
+# obj-$(CONFIG_X)/lib-$(CONFIG_X)/foo-$(CONFIG_X) lines. The parse of each
+# file (with the sizes of the sources its objects come from) is cached by
+# the file mtime, objects and subdirectories are then expanded to sources:
+# foo.o to its composite parts or to foo.c/foo.S/foo.rs, dir/ to the
+# unconditional objects of its Makefile. Sizes are those seen when the
+# Makefile was last parsed. With srcarch, the Makefiles of the other
+# arch/* directories are left out of the index (they stay in the cache).
+OBJINDEX_VERSION = 1
+KBUILD_LINE = re.compile(r"^([A-Za-z0-9_./-]+?)-(y|m|objs|\$\(CONFIG_([A-Za-z0-9_]+)\))\s*(?::=|\+=|=)\s*(.*)$")
+
+def objindex_parse(srcdir, path):
+    reldir = os.path.dirname(path)
+    assigns = []
+    sources = {}
+    with open(os.path.join(srcdir, path), errors="replace") as mfile:
+        text = mfile.read().replace("\\\n", " ")
+    for line in text.splitlines():
+        m = KBUILD_LINE.match(line.strip())
+        if m is None:
+            continue
+        tokens = [t for t in m.group(4).split("#")[0].split() if t.endswith(".o") or t.endswith("/")]
+        if not tokens:
+            continue
+        assigns.append([m.group(1), m.group(3), tokens])
+        for token in tokens:
+            if not token.endswith(".o") or token in sources:
+                continue
+            for ext in [".c", ".S", ".rs"]:
+                src = os.path.normpath(os.path.join(reldir, token[:-2] + ext))
+                try:
+                    sources[token] = [src, os.stat(os.path.join(srcdir, src)).st_size]
+                    break
+                except OSError:
+                    pass
+    return {"assigns": assigns, "sources": sources}
+
+# parse a chunk of Makefiles in an --footprint worker process
+def objindex_worker(srcdir, paths):
+    result = {}
+    for path, stamp in paths:
+        try:
+            result[path] = stamp + [objindex_parse(srcdir, path)]
+        except OSError:
+            pass
+    return result
+
+# {symbol name: {source path: bytes}}
+def objindex(srcarch=None, jobs=1):
+    path = os.path.join(cachedir, "objindex-%s.json" % hashlib.sha1(sourcedir.encode("UTF8")).hexdigest())
+    cached = {}
+    try:
+        with open(path) as ofile:
+            data = json.load(ofile)
+        if data.get("version") == OBJINDEX_VERSION:
+            cached = data["makefiles"]
+    except (OSError, ValueError):
+        pass
+    makefiles = {}
+    todo = []
+    for dirpath, dirnames, filenames in os.walk(sourcedir):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        # kbuild reads Kbuild rather than Makefile when both exist
+        for name in ["Kbuild", "Makefile"]:
+            if name in filenames:
+                break
+        else:
+            continue
+        mpath = os.path.relpath(os.path.join(dirpath, name), sourcedir)
+        try:
+            st = os.stat(os.path.join(dirpath, name))
+        except OSError:
+            continue
+        stamp = [st.st_mtime_ns, st.st_size]
+        if mpath in cached and cached[mpath][:2] == stamp:
+            makefiles[mpath] = cached[mpath]
+        else:
+            todo.append((mpath, stamp))
+    if todo and jobs > 1 and len(todo) > 100:
+        import concurrent.futures
+        size = (len(todo) + jobs - 1) // jobs
+        with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+            for result in executor.map(objindex_worker, [sourcedir] * jobs, [todo[i:i + size] for i in range(0, len(todo), size)]):
+                makefiles.update(result)
+    elif todo:
+        makefiles.update(objindex_worker(sourcedir, todo))
+    if todo or len(makefiles) != len(cached):
+        try:
+            os.makedirs(cachedir, exist_ok=True)
+            write_atomic(path, lambda ofile: json.dump({"version": OBJINDEX_VERSION, "makefiles": makefiles}, ofile))
+        except OSError as e:
+            if args.debug:
+                print("WARNING: cannot write object index %s: %s" % (path, e))
+
+    parsed = {}
+    for mpath, entry in makefiles.items():
+        parts = mpath.split("/")
+        if srcarch is not None and parts[0] == "arch" and len(parts) > 2 and parts[1] != srcarch:
+            continue
+        parsed[os.path.dirname(mpath)] = entry[2]
+    expanded = {}
+
+    # sources always built with the object or directory token of reldir
+    def expand(reldir, token):
+        key = (reldir, token)
+        if key in expanded:
+            return expanded[key]
+        expanded[key] = {}
+        files = {}
+        entry = parsed.get(reldir, {"assigns": [], "sources": {}})
+        if token.endswith("/"):
+            subdir = os.path.normpath(os.path.join(reldir, token))
+            for name, cond, tokens in parsed.get(subdir, {"assigns": []})["assigns"]:
+                if cond is None and name in ["obj", "lib"]:
+                    for sub in tokens:
+                        files.update(expand(subdir, sub))
+        else:
+            parts = [tokens for name, cond, tokens in entry["assigns"] if name == token[:-2] and cond is None]
+            for tokens in parts:
+                for sub in tokens:
+                    files.update(expand(reldir, sub))
+            if not parts and token in entry["sources"]:
+                src, size = entry["sources"][token]
+                files[src] = size
+        expanded[key] = files
+        return files
+
+    index = {}
+    for reldir, entry in parsed.items():
+        for name, cond, tokens in entry["assigns"]:
+            if cond is None:
+                continue
+            files = index.setdefault(cond, {})
+            for token in tokens:
+                files.update(expand(reldir, token))
+    return index
+
+# {symbol name: (files, bytes)}
+def footprints(index):
+    return dict((name, (len(files), sum(files.values()))) for name, files in index.items())
+
+def footprint():
+    sizes = footprints(objindex(args.arch, max(args.jobs or 1, 1)))
+    names = sizes.keys()
+    if args.arch and args.defconfig:
+        kconf = load_defconfig(args.arch, args.defconfig, warn_to_stderr=True)
+        names = [sym.name for sym in kconf.unique_defined_syms if sym.name in sizes and sym.orig_type in (BOOL, TRISTATE) and sym.tri_value > 0]
+    for name in sorted(names, key=lambda x: (-sizes[x][1], x)):
+        print("%s %d %d" % (name, sizes[name][0], sizes[name][1]))
+
+# Builds the footprint index of srcarch for the UI in a thread, the result is
+# set once
+class FootprintIndexer:
+    def __init__(self, srcarch):
+        self.srcarch = srcarch
+        self.result = None
+        self.error = None
+        th = threading.Thread(target=self.run, daemon=True)
+        th.start()
+
+    def run(self):
+        try:
+            self.result = footprints(objindex(self.srcarch))
+        except (OSError, RecursionError) as e:
+            self.error = str(e)
+            self.result = {}
+
+# --watch: stat of the Kconfig files (and their directories) of a parsed tree,
+# polled from the idle loop at most every interval seconds. kconfiglib cannot
+# parse a part of a tree again, a change means a full reparse in the Loader.
+class KconfWatch:
+    def __init__(self, kconf, interval=1.0):
+        self.paths = kconf_paths(kconf)
+        self.interval = interval
+        self.stamp = kconf_stamp(self.paths, [])["files"]
+        self.next = time.monotonic() + interval
+
+    def changed(self):
+        now = time.monotonic()
+        if now < self.next:
+            return False
+        self.next = now + self.interval
+        stamp = kconf_stamp(self.paths, [])["files"]
+        if stamp == self.stamp:
+            return False
+        self.stamp = stamp
+        return True
+
+# Parses Kconfig, loads defconfigs and builds the row/tag indexes in a worker
+# thread so that the UI keeps drawing and reading keys. Only the last request
+# counts: a cancelled or superseded job still runs to its end (a parse cannot
+# be interrupted, and its Kconfig stays in kconf_lru) but its result is
+# dropped. A prefetch only parses the Kconfig of an arch.
+class Loader:
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.job = None
+        self.generation = 0
+        self.status = ""
+        self.result = None
+        th = threading.Thread(target=self.run, daemon=True)
+        th.start()
+
+    # reparse: drop the resident Kconfig of srcarch, its files changed
+    def request(self, srcarch, defconfig, filters=None, reparse=False):
+        with self.cond:
+            self.generation += 1
+            self.job = (self.generation, srcarch, defconfig, filters, reparse)
+            self.result = None
+            self.cond.notify()
+            return self.generation
+
+    # parse the Kconfig of srcarch if the worker has nothing better to do
+    def prefetch(self, srcarch):
+        with self.cond:
+            if self.job is not None and self.job[2] is not None:
+                return
+            if self.status or kconf_resident(srcarch):
+                return
+            self.job = (self.generation, srcarch, None, None, False)
+            self.cond.notify()
+
+    def cancel(self):
+        with self.cond:
+            self.generation += 1
+            self.job = None
+            self.result = None
+
+    # the result of the request generation, once ready
+    def take(self, generation):
+        with self.cond:
+            if self.result is None or self.result[0] != generation:
+                return None
+            result = self.result
+            self.result = None
+            return result
+
+    def progress(self, status):
+        with self.cond:
+            self.status = status
+
+    def run(self):
+        while True:
+            with self.cond:
+                while self.job is None:
+                    self.cond.wait()
+                generation, srcarch, defconfig, filters, reparse = self.job
+                self.job = None
+            try:
+                if reparse:
+                    with kconf_lru_lock:
+                        kconf_lru.pop((sourcedir, srcarch), None)
+                if not kconf_resident(srcarch):
+                    self.progress("parsing Kconfig of %s" % srcarch)
+                    get_kconf(srcarch)
+                result = None
+                if defconfig is not None and generation == self.generation:
+                    self.progress("loading %s" % defconfig)
+                    kconf = load_defconfig(srcarch, defconfig)
+                    self.progress("indexing %s" % defconfig)
+                    tags = SymTags(kconf, defconfig)
+                    result = (generation, kconf, SymRows(kconf, filters, tags), tags, None)
+            except (OSError, kconfiglib.KconfigError, SystemExit) as e:
+                result = (generation, None, None, None, str(e))
+            except Exception as e:
+                # a bug must not end the thread, the UI would wait forever
+                result = (generation, None, None, None, "%s: %s" % (e.__class__.__name__, e))
+            with self.cond:
+                self.status = ""
+                if result is not None and generation == self.generation:
+                    self.result = result
+
+def ui(stdscr):
+    cmd = 0
+    curses.init_pair(L_RED, curses.COLOR_RED, curses.COLOR_BLACK)
+    curses.init_pair(L_GREEN, curses.COLOR_GREEN, curses.COLOR_BLACK)
+    curses.init_pair(L_BLUE, curses.COLOR_BLUE, curses.COLOR_BLACK)
+    curses.init_pair(L_WHITE, curses.COLOR_WHITE, curses.COLOR_BLACK)
+    curses.init_pair(L_CYAN, curses.COLOR_CYAN, curses.COLOR_BLACK)
+    curses.init_pair(L_YELLOW, curses.COLOR_YELLOW, curses.COLOR_BLACK)
+    curses.init_pair(L_TGT, curses.COLOR_GREEN, curses.COLOR_WHITE)
+    curses.init_pair(L_INPUT, curses.COLOR_BLACK, curses.COLOR_WHITE)
+    stdscr.timeout(50)
+    needexit = False
+    swin = None
+    arch = None
+    srcarch = None
+    defconfig = None
+    if args.arch:
+        srcarch = args.arch
+        if args.defconfig:
+            defconfig = args.defconfig
+    archlist = []
+    p = 0
+    offset = 0
+    pad = None
+    ipad = None
+    cur = ""
+    search = ""
+    insearch = 0
+    searchfull = False
+    searcher = None
+    hits = []
+    hitrows = []
+    hitgen = -1
+    searchn = 0
+    filters = []
+    notno = False
+    userfilter = None
+    infilter = None
+    symrows = None
+    tags = None
+    marked = set()
+    impacts = {}
+    impactgen = -1
+    loader = Loader()
+    loading = None
+    loadgen = None
+    watch = None
+    reloading = False
+    indexer = None
+    sizes = None
+    bysize = False
+    error = None
+    message = None
+    journal = None
+    checkpointing = None
+    keytime = None
+    keyhandled = False
+    cprofile = None
+    cprofiles = 0
+    if defconfig is not None:
+        loading = defconfig
+        defconfig = None
+        loadgen = loader.request(srcarch, loading, filters)
+    dirty = True
+    while not needexit:
+        if not dirty and loading is None:
+            # nothing changed since last frame, only wait for input
+            c = stdscr.getch()
+            if c == -1:
+                if sizes is None and indexer is not None and indexer.result is not None:
+                    # footprints ready, draw them
+                    pass
+                elif watch is None or not watch.changed():
+                    continue
+                else:
+                    # reparse in the background, the old tree stays usable
+                    loading = defconfig
+                    reloading = True
+                    loadgen = loader.request(srcarch, defconfig, filters, reparse=True)
+            else:
+                keytime = time.perf_counter()
+                curses.ungetch(c)
+        dirty = False
+        framestart = time.perf_counter()
+        if sizes is None and indexer is not None and indexer.result is not None:
+            sizes = indexer.result
+            if indexer.error:
+                error = "footprint index: %s" % indexer.error
+            if bysize and defconfig != None:
+                symrows.sort(lambda sym: -sizes.get(sym.name, (0, 0))[1])
+        if loading is not None:
+            result = loader.take(loadgen)
+            if result is not None:
+                if result[4] is None and reloading:
+                    # same defconfig: carry the edits and the cursor over
+                    kconf, symrows, tags = result[1:4]
+                    if bysize and sizes is not None:
+                        symrows.sort(lambda sym: -sizes.get(sym.name, (0, 0))[1])
+                    symrows.update(journal.remap(kconf))
+                    hits = []
+                    hitrows = []
+                    row = symrows.row_of(kconf.syms.get(cur))
+                    if row >= 0:
+                        offset = max(row - p, 0)
+                        p = row - offset
+                    error = None
+                    message = "Kconfig changed, reloaded"
+                elif result[4] is None:
+                    defconfig = loading
+                    kconf, symrows, tags = result[1:4]
+                    if indexer is None or indexer.srcarch != srcarch:
+                        # the Makefiles are read once a tree of the arch is loaded
+                        indexer = FootprintIndexer(srcarch)
+                        sizes = None
+                    if bysize and sizes is not None:
+                        symrows.sort(lambda sym: -sizes.get(sym.name, (0, 0))[1])
+                    journal = EditJournal()
+                    marked = set()
+                    pad = None
+                    p = 0
+                    offset = 0
+                else:
+                    error = result[4]
+                if result[4] is None and args.watch:
+                    watch = KconfWatch(kconf)
+                loading = None
+                reloading = False
+        #now = time.time()
+        rows, cols = stdscr.getmaxyx()
+        if not swin:
+            swin = curses.newwin(rows, cols, 0, 0)
+        swin.erase()
+        swin.addstr(0, 0, "Screen %dx%d ARCH: %s SRCARCH: %s Defconfig: %s Source: %s y%d of%d" % (cols, rows, arch, srcarch, defconfig, sourcedir, p, offset))
+        if profiler is not None:
+            swin.addstr(3, 0, profiler.hud()[:cols - 1])
+        if loading is not None:
+            swin.addstr(1, 0, "Loading %s: %s (ESC to cancel)" % (loading, loader.status or "waiting"))
+        if error:
+            swin.addstr(1, 0, "ERROR: %s" % error.splitlines()[0])
+        elif message:
+            swin.addstr(1, 0, message)
+        if srcarch is None:
+            if pad is None:
+                archlist = list_arches()
+                pad = curses.newpad(100, 200)
+            swin.addstr(2, 0, "Choose arch:")
+            y = 0
+            if p < 0:
+                p = 0
+            if p >= len(archlist) - 1:
+                p = len(archlist) - 1
+            if archlist:
+                loader.prefetch(archlist[p])
+            for a in archlist:
+                if p == y:
+                    pad.addstr(y, 0, "x %s" % a)
+                else:
+                    pad.addstr(y, 0, "  %s" % a)
+                y += 1
+        if srcarch is not None and defconfig is None:
+            if pad is None:
+                defconfig_list = list_defconfigs(srcarch)
+                pad = curses.newpad(len(defconfig_list), 200)
+            swin.addstr(2, 0, "Choose defconfig: (%d)" % len(defconfig_list))
+            loader.prefetch(srcarch)
+            y = 0
+            if p < 0:
+                p = 0
+            if p >= len(defconfig_list) - 1:
+                p = len(defconfig_list) - 1
+            for a in defconfig_list:
+                if p + offset == y:
+                    pad.addstr(y, 0, "x %s" % a)
+                else:
+                    pad.addstr(y, 0, "  %s" % a)
+                y += 1
+
+        if defconfig != None:
+            if pad is None:
+                pad = curses.newpad(rows, 200)
+                ipad = curses.newpad(200, 200)
+            if pad.getmaxyx()[0] != rows:
+                pad = curses.newpad(rows, 200)
+            swin.addstr(2, 0, "Choose config: (%d/%d) curr=%s debug on: %d harden on: %d marked: %d" % (len(symrows), len(kconf.unique_defined_syms), cur, tags.count_enabled(TAG_DEBUG), tags.count_enabled(TAG_HARDEN), len(marked)))
+            if userfilter:
+                swin.addstr(" filter: %s" % userfilter[:max(cols - swin.getyx()[1] - 10, 0)])
+            last = len(symrows) - 1
+            if p + offset > last:
+                offset = max(min(offset, last), 0)
+                p = max(last - offset, 0)
+            if impactgen != values_generation:
+                impacts = {}
+                impactgen = values_generation
+            cur = draw_symbols(pad, ipad, symrows, tags, marked, offset, rows - 4, p + offset, impacts, sizes)
+
+        if infilter is not None:
+            swin.addstr(1, 0, "FILTER (@name to use, @name expr to save): %s" % infilter)
+        if insearch > 0:
+            found = "%d/%d" % (searchn + 1 if hitrows else 0, len(hitrows))
+            if searchfull:
+                swin.addstr(1, 0, "TEXT SEARCH: %s  %s" % (search, found))
+            else:
+                swin.addstr(1, 0, "SEARCH: %s  %s" % (search, found))
+
+        swin.noutrefresh()
+        if pad:
+            if defconfig != None:
+                pad.noutrefresh(0, 0, 4, 0, rows - 1, cols - 1)
+            else:
+                pad.noutrefresh(offset, 0, 4, 0, rows - 1, cols - 1)
+        if ipad:
+            ipad.noutrefresh(0, 0, 5, 50, rows - 1, cols - 1)
+        curses.doupdate()
+        profile_add("frame", framestart)
+        if keyhandled:
+            profile_add("key", keytime)
+            keytime = None
+            keyhandled = False
+
+        c = stdscr.getch()
+        if c == -1:
+            continue
+        if keytime is None:
+            keytime = time.perf_counter()
+        keyhandled = True
+        dirty = True
+        error = None
+        message = None
+        if checkpointing is not None:
+            # second key of k/K: the checkpoint name
+            if c >= ord("0") and c <= ord("9"):
+                if checkpointing == "k":
+                    journal.checkpoint(chr(c))
+                    message = "Checkpoint %s set" % chr(c)
+                else:
+                    syms = journal.restore(chr(c))
+                    if syms is None:
+                        error = "checkpoint %s is not in the history" % chr(c)
+                    else:
+                        symrows.update(syms)
+                        message = "Checkpoint %s restored, %d values changed" % (chr(c), len(syms))
+            checkpointing = None
+            c = -1
+        if loading is not None and c == 27:
+            loader.cancel()
+            loading = None
+            reloading = False
+            c = -1
+        if infilter is not None:
+            if c == 8 or c == 127 or c == curses.KEY_BACKSPACE:
+                infilter = infilter[:-1]
+            elif c == 27:
+                infilter = None
+            elif c == curses.KEY_ENTER or c == 10 or c == 13:
+                text = infilter.strip()
+                infilter = None
+                name = None
+                if text.startswith("@"):
+                    name, sep, text = text[1:].partition(" ")
+                    text = text.strip()
+                    if not text:
+                        text = configs.get("filters", {}).get(name)
+                        if text is None:
+                            error = "no saved filter %s" % name
+                        name = None
+                try:
+                    if text:
+                        compile_filter(text)
+                    if error is None:
+                        userfilter = text or None
+                        if name:
+                            tagstore.set_filter(name, text)
+                            message = "Filter %s saved" % name
+                except ValueError as e:
+                    error = "filter: %s" % e
+                filters = (["!=n"] if notno else []) + ([userfilter] if userfilter else [])
+                if defconfig != None:
+                    symrows.set_filters(filters)
+                    p = 0
+                    offset = 0
+                    hitgen = -1
+            elif c >= 32 and c < 127:
+                infilter += chr(c)
+            c = -1
+        if insearch == 1:
+            update = False
+            if c == 8 or c == 127 or c == curses.KEY_BACKSPACE:
+                if len(search) > 0:
+                    search = search[:-1]
+                    update = True
+            if c == curses.KEY_ENTER or c == 10 or c == 13:
+                insearch = 2
+                if len(search) == 0:
+                    insearch = 0
+            if c > 0 and c < 256 and (chr(c).isalnum() or c == ord("_")):
+                search += chr(c)
+                update = True
+            if update:
+                # search as you type
+                hits = []
+                if search:
+                    hits = searcher.find(search, searchfull)
+                hitrows = symrows.rows_of(hits)
+                hitgen = symrows.generation
+                searchn = 0
+                if hitrows:
+                    p = hitrows[0]
+                    offset = 0
+            c = -1
+        if (c == ord(",") or c == ord(";")) and defconfig != None and symrows is not None:
+            if hitgen != symrows.generation:
+                hitrows = symrows.rows_of(hits)
+                hitgen = symrows.generation
+                searchn = 0
+            if hitrows:
+                if c == ord(","):
+                    searchn = (searchn + 1) % len(hitrows)
+                else:
+                    searchn = (searchn - 1) % len(hitrows)
+                p = hitrows[searchn]
+                offset = 0
+        if c == 27 or c == ord('q'):
+            needexit = True
+        if c == curses.KEY_UP:
+            p -= 1
+        if c == curses.KEY_DOWN:
+            p += 1
+        if c == curses.KEY_PPAGE:
+            p -= 20
+        if c == curses.KEY_NPAGE:
+            p += 20
+        if p < 0:
+            if offset > 0:
+                offset += p
+            if offset < 0:
+                offset = 0
+            p = 0
+        if p > rows - 5:
+            offset += p - (rows - 5)
+            p = rows - 5
+        if c == curses.KEY_F5:
+            p = 0
+            offset = 0
+            notno = not notno
+            filters = (["!=n"] if notno else []) + ([userfilter] if userfilter else [])
+            if defconfig != None:
+                symrows.set_filters(filters)
+        if c == curses.KEY_F6 and defconfig != None:
+            if sizes is None:
+                message = "Footprints not ready, reading the Makefiles"
+            else:
+                bysize = not bysize
+                if bysize:
+                    symrows.sort(lambda sym: -sizes.get(sym.name, (0, 0))[1])
+                else:
+                    symrows.sort()
+                p = 0
+                offset = 0
+                hitgen = -1
+        if c == curses.KEY_F1:
+            loader.cancel()
+            loading = None
+            reloading = False
+            watch = None
+            srcarch = None
+            defconfig = None
+            defconfig_list = None
+            pad = None
+            ipad = None
+            insearch = 0
+            hits = []
+            hitrows = []
+            swin.erase()
+            p = 0 
+            offset = 0
+        if c == ord("o") and defconfig != None:
+            # save result
+            write_if_changed('%s/arch/%s/configs/%s' % (sourcedir, srcarch, defconfig), config_text(kconf))
+        if (c == ord("s") or c == ord("S")) and defconfig != None:
+            # save result
+            write_if_changed('%s/config.out' % configdir, config_text(kconf, full=c == ord("S"), skip_empty=True))
+        if c == ord("/") or c == ord("?"):
+            if defconfig != None:
+                if searcher is None or searcher.kconf is not kconf:
+                    searcher = SymSearch(kconf)
+                searchfull = c == ord("?")
+                search = ""
+                hits = []
+                hitrows = []
+                insearch = 1
+        if c == ord("f") and defconfig != None:
+            infilter = userfilter or ""
+        if c == ord("*"):
+            config_set(cur, "harden", None, True)
+            if tags:
+                tags.refresh(cur)
+                symrows.retag()
+        if c == ord("-"):
+            config_set(cur, "debug", None, True)
+            if tags:
+                tags.refresh(cur)
+                symrows.retag()
+        if c == ord("r") and defconfig != None:
+            journal.begin()
+            symrows.update(set_values(kconf, [cur], None, journal))
+            journal.end()
+        if c == ord("n") and defconfig != None:
+            journal.begin()
+            symrows.update(set_values(kconf, [cur], 0, journal))
+            journal.end()
+        if c == ord("y") and defconfig != None:
+            journal.begin()
+            symrows.update(set_values(kconf, [cur], 2, journal))
+            journal.end()
+        if c == curses.KEY_F12:
+            # cProfile of the UI thread between two F12
+            if cprofile is None:
+                import cProfile
+                cprofile = cProfile.Profile()
+                cprofile.enable()
+                message = "cProfile started, F12 to stop"
+            else:
+                cprofile.disable()
+                cprofiles += 1
+                path = "%s/kconfigizer-%d-%d.prof" % (configdir, os.getpid(), cprofiles)
+                cprofile.dump_stats(path)
+                cprofile = None
+                message = "cProfile written to %s" % path
+        if c == ord("u") and defconfig != None:
+            symrows.update(journal.undo())
+        if c == ord("U") and defconfig != None:
+            symrows.update(journal.redo())
+        if (c == ord("k") or c == ord("K")) and defconfig != None:
+            checkpointing = chr(c)
+            if c == ord("k"):
+                message = "Set checkpoint (0-9)"
+            else:
+                message = "Restore checkpoint (0-9)"
+        if c == ord("i") and defconfig != None:
+            sym = kconf.syms.get(cur)
+            if sym is not None:
+                impacts[sym] = impact_str(impact(kconf, sym))
+        if c == ord("M") and defconfig != None:
+            journal.begin()
+            changed, held = minimize(kconf, tags, journal)
+            journal.end()
+            symrows.update(changed)
+            kconf.write_min_config("%s/config.min" % configdir)
+            marked = set(sym.name for sym in held)
+            if impactgen != values_generation:
+                impacts = {}
+                impactgen = values_generation
+            for sym in held:
+                impacts[sym] = held[sym]
+        if c == ord("v") and defconfig != None:
+            if cur in marked:
+                marked.remove(cur)
+            else:
+                marked.add(cur)
+        if c == ord("V") and defconfig != None:
+            for i in hits:
+                marked.add(kconf.unique_defined_syms[i].name)
+        if c == ord("D") and defconfig != None:
+            for i in tags.indices(TAG_DEBUG):
+                marked.add(kconf.unique_defined_syms[i].name)
+        if c == ord("C"):
+            marked = set()
+        if c == ord("R") and defconfig != None:
+            journal.begin()
+            symrows.update(set_values(kconf, marked, None, journal))
+            journal.end()
+        if c == ord("N") and defconfig != None:
+            journal.begin()
+            symrows.update(set_values(kconf, marked, 0, journal))
+            journal.end()
+        if c == ord("Y") and defconfig != None:
+            journal.begin()
+            symrows.update(set_values(kconf, marked, 2, journal))
+            journal.end()
+        if c == ord(" "):
+            if defconfig:
+                config_set(cur, "need", defconfig, True)
+                tags.refresh(cur)
+                symrows.retag()
+            if srcarch is not None and defconfig is None:
+                # the list stays usable until loaded, another pick supersedes
+                loading = defconfig_list[p + offset]
+                loadgen = loader.request(srcarch, loading, filters)
+            if srcarch is None:
+                srcarch = archlist[p + offset]
+                pad = None
+def main():
+    global args, profiler
+    args = parser.parse_args()
+    if args.profile:
+        profiler = Profiler()
+        atexit.register(lambda: profiler.dump("%s/kconfigizer-trace.json" % configdir))
+    if args.compare:
+        # the first side is the current source
+        args.source = args.compare[0]
+    setup()
+
+    if args.batch:
+        batch()
+        sys.exit(0)
+
+    if args.overwrite:
+        overwrite()
+        sys.exit(0)
+
+    if args.harden:
+        harden()
+        sys.exit(0)
+
+    if args.compare:
+        compare()
+        sys.exit(0)
+
+    if args.serve:
+        serve()
+        sys.exit(0)
+
+    if args.client:
+        client()
+        sys.exit(0)
+
+    if args.minimize:
+        kconf = load_defconfig(args.arch, args.defconfig, warn_to_stderr=True)
+        changed, held = minimize(kconf, SymTags(kconf, args.defconfig))
+        outdir = "%s/minimize/%s" % (configdir, args.arch)
+        os.makedirs(outdir, exist_ok=True)
+        kconf.write_min_config("%s/%s" % (outdir, args.defconfig))
+        for sym in sorted(held, key=lambda x: x.name):
+            print("%s %s %s" % (sym.name, sym.str_value, held[sym]))
+        print("%d configs disabled, %d kept, minimal defconfig in %s/%s" % (len(changed), len(held), outdir, args.defconfig))
+        sys.exit(0)
+
+    if args.impact:
+        kconf = load_defconfig(args.arch, args.defconfig, warn_to_stderr=True)
+        if args.impact not in kconf.syms:
+            print("ERROR: unknown symbol %s" % args.impact)
+            sys.exit(1)
+        changes = impact(kconf, kconf.syms[args.impact])
+        if changes is None:
+            print("ERROR: impact of %s is not simulated (choice member or not bool/tristate)" % args.impact)
+            sys.exit(1)
+        for sym, old, new in changes:
+            print("%s %s -> %s" % (sym.name, TRI_TO_STR[old], TRI_TO_STR[new]))
+        sys.exit(0)
+
+    if args.footprint:
+        footprint()
+        sys.exit(0)
+
+    if args.matrix or args.matrix_enables or args.matrix_diff or args.matrix_debug:
+        matrix()
+        sys.exit(0)
+
+    if not args.debug:
+        wrapper(ui)
+        sys.exit(0)
+
+    print("START in %s" % sourcedir)
+
+    kconf = load_defconfig(args.arch, args.defconfig, warn_to_stderr=True)
+    write_if_changed('%s/%s-%s.load2' % (configdir, args.arch, args.defconfig), config_text(kconf))
+
+    print(len(kconf.unique_defined_syms))
+    for sym in kconf.unique_defined_syms:
+        if sym.user_value is None:
+            if sym.assignable or sym.type == 27:
+                toto = 1
+                print("  %s %s" % (sym.name, sym.str_value))
+            continue
+        print("%s %s" % (sym.name, sym.str_value))
+        if sym.rev_dep:
+            if type(sym.rev_dep) == kconfiglib.Symbol:
+                if sym.rev_dep.name == "n":
+                    continue
+                print(sym.rev_dep)
+                print(" %s SELECTED by %s:%s" % (sym.name, sym.rev_dep.name, sym.str_value))
+                continue
+            print("%s %s" % (sym.name, sym.str_value))
+            fs = dprint(sym.rev_dep)
+            print("=================")
+            print(fs)
+            print("=================")
@@ -27,6 +27,7 @@ setup(
     author_email='clabbe.montjoie@gmail.com',
     packages=find_packages(),
     scripts=["kconfigizer.py"],
+    py_modules=["kconfigizer_core"],
     license='Apache2',
     long_description=read('README.md'),
     long_description_content_type='text/markdown',
@@ -0,0 +1,139 @@
+# impact() checked against a real set_value() on every bool/tristate symbol
+# outside choices of a small tree using "if", "visible if", choices, MODULES,
+# select, imply and an int symbol used in a dependency.
+
+import os
+import sys
+
+import kconfiglib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import kconfigizer_core as K
+
+KCONFIG = """
+config MODULES
+	bool "modules"
+	option modules
+
+config EXPERT
+	bool "expert"
+
+config B
+	bool "b"
+	default y
+
+config A
+	bool "a" if B
+
+config AT
+	tristate "at" if EXPERT
+	default m
+
+menu "visible if"
+	visible if B
+
+config C
+	bool "c"
+
+config CT
+	tristate "ct"
+
+endmenu
+
+config SEL
+	bool "sel"
+	select CT
+	imply AT
+
+config N
+	int "n"
+	depends on B
+	default 3
+
+config NX
+	bool "nx"
+	depends on N = 3
+	default y
+
+choice
+	prompt "choice"
+	depends on EXPERT || B
+	default CA
+
+config CA
+	bool "ca"
+
+config CB
+	bool "cb"
+	depends on A
+
+endchoice
+
+config AFTER_CA
+	tristate "after ca"
+	depends on CA
+	default y
+
+config AFTER_CB
+	bool
+	default CB
+"""
+
+DEFCONFIGS = [
+    "CONFIG_MODULES=y\nCONFIG_A=y\nCONFIG_C=y\nCONFIG_CT=m\n",
+    "CONFIG_MODULES=y\nCONFIG_EXPERT=y\nCONFIG_A=y\nCONFIG_C=y\nCONFIG_AT=y\nCONFIG_CB=y\nCONFIG_SEL=y\n",
+    "CONFIG_B=n\nCONFIG_EXPERT=y\nCONFIG_AT=m\n",
+]
+
+def tristates(kconf):
+    return [(sym, sym.tri_value) for sym in kconf.unique_defined_syms if sym.orig_type in (K.BOOL, K.TRISTATE)]
+
+def real_change(kconf, sym, value):
+    before = tristates(kconf)
+    old = sym.user_value
+    sym.set_value(value)
+    changes = [(other, tri, other.tri_value) for other, tri in before if other.tri_value != tri]
+    if old is None:
+        sym.unset_value()
+    else:
+        sym.set_value(old)
+    return changes
+
+def test_impact_matches_set_value(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "Kconfig").write_text(KCONFIG)
+    kconf = kconfiglib.Kconfig("Kconfig", warn=False)
+    checked = 0
+    for i, text in enumerate(DEFCONFIGS):
+        (tmp_path / ("%d_defconfig" % i)).write_text(text)
+        kconf.load_config("%d_defconfig" % i)
+        for sym in kconf.unique_defined_syms:
+            if sym.orig_type not in (K.BOOL, K.TRISTATE) or sym.choice:
+                continue
+            for value in (0, 2):
+                state = tristates(kconf)
+                expected = sorted(real_change(kconf, sym, value), key=lambda c: c[0].name)
+                assert tristates(kconf) == state
+                got = sorted(K.impact(kconf, sym, value), key=lambda c: c[0].name)
+                assert tristates(kconf) == state
+                assert [(c.name, old, new) for c, old, new in got] == [(c.name, old, new) for c, old, new in expected], \
+                    "%s=%d in %d_defconfig" % (sym.name, value, i)
+                checked += 1
+    assert checked > 30
+
+def test_impact_visibility(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "Kconfig").write_text(KCONFIG)
+    kconf = kconfiglib.Kconfig("Kconfig", warn=False)
+    (tmp_path / "defconfig").write_text(DEFCONFIGS[0])
+    kconf.load_config("defconfig")
+    names = set(c.name for c, old, new in K.impact(kconf, kconf.syms["B"]))
+    assert {"B", "A", "C", "CT", "NX"} <= names
+
+def test_impact_not_simulated(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "Kconfig").write_text(KCONFIG)
+    kconf = kconfiglib.Kconfig("Kconfig", warn=False)
+    assert K.impact(kconf, kconf.syms["CA"]) is None
+    assert K.impact(kconf, kconf.syms["N"]) is None
+    assert K.impact_str(None) == "IF n: not simulated"
@@ -0,0 +1,80 @@
+# EditJournal undo/redo, checkpoints and remap() on a choice
+
+import os
+import sys
+
+import kconfiglib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import kconfigizer_core as K
+
+KCONFIG = """
+choice
+	prompt "choice"
+	default CA
+
+config CA
+	bool "ca"
+
+config CB
+	bool "cb"
+
+config CC
+	bool "cc"
+
+endchoice
+
+config OTHER
+	bool "other"
+"""
+
+def load():
+    kconf = kconfiglib.Kconfig("Kconfig", warn=False)
+    kconf.load_config("defconfig")
+    return kconf
+
+def values(kconf):
+    return [(sym.name, sym.str_value) for sym in kconf.unique_defined_syms]
+
+def edit(kconf, journal, name, value):
+    journal.begin()
+    K.set_values(kconf, [name], value, journal)
+    journal.end()
+
+def test_undo_choice(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "Kconfig").write_text(KCONFIG)
+    (tmp_path / "defconfig").write_text("")
+    kconf = load()
+    journal = K.EditJournal()
+    start = values(kconf)
+    journal.checkpoint("0")
+    edit(kconf, journal, "CB", 2)
+    after_cb = values(kconf)
+    assert kconf.syms["CB"].str_value == "y" and kconf.syms["CA"].str_value == "n"
+    edit(kconf, journal, "CC", 2)
+    after_cc = values(kconf)
+    journal.undo()
+    assert values(kconf) == after_cb
+    journal.undo()
+    assert values(kconf) == start
+    journal.redo()
+    journal.redo()
+    assert values(kconf) == after_cc
+    assert journal.restore("0") is not None
+    assert values(kconf) == start
+    assert kconf.named_choices == {} and kconf.syms["CA"].choice.user_selection is None
+
+def test_remap_choice(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "Kconfig").write_text(KCONFIG)
+    (tmp_path / "defconfig").write_text("")
+    kconf = load()
+    journal = K.EditJournal()
+    edit(kconf, journal, "CB", 2)
+    edited = values(kconf)
+    kconf = load()
+    journal.remap(kconf)
+    assert values(kconf) == edited
+    journal.undo()
+    assert kconf.syms["CA"].str_value == "y" and kconf.syms["CB"].str_value == "n"
@@ -0,0 +1,36 @@
+# SymRows.update() against a SymRows built from scratch after the same change
+
+import os
+import sys
+
+import kconfiglib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import kconfigizer_core as K
+
+KCONFIG = """
+config MODULES
+	bool "modules"
+	option modules
+
+config T1
+	tristate "t1"
+
+config T2
+	tristate "t2"
+	depends on T1
+"""
+
+def test_update_modules(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "Kconfig").write_text(KCONFIG)
+    (tmp_path / "defconfig").write_text("CONFIG_MODULES=y\nCONFIG_T1=m\nCONFIG_T2=m\n")
+    kconf = kconfiglib.Kconfig("Kconfig", warn=False)
+    kconf.load_config("defconfig")
+    rows = K.SymRows(kconf, ["=m"])
+    assert len(rows) == 2
+    for value in (0, 2):
+        changed = rows.update(K.set_values(kconf, ["MODULES"], value))
+        fresh = K.SymRows(kconf, ["=m"])
+        assert [rows[i] for i in range(len(rows))] == [fresh[i] for i in range(len(fresh))]
+        assert kconf.syms["T1"] in changed